@@ -0,0 +1,271 @@
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+import voting as vT
+
+'''
+This file measures the performance of 'voting.py' on synthetic elections
+
+The valuations of the agents are generated from one of the following models:
+    'ic'      - impartial culture: every valuation is independent and uniformly distributed, so every ranking is equally likely
+    'mallows' - Mallows model: the rankings are close to a reference ranking (1, 2, ... m); the dispersion 'phi' is between 0 and 1,
+                a smaller phi gives rankings closer to the reference ranking
+    'pl'      - Plackett-Luce model: each alternative has a weight, and the alternatives with larger weights are more likely to be preferred
+
+For every model, number of agents and number of alternatives, the time of 'generatePreferences', of each voting rule and of 'tieBreak' is measured,
+together with the number of agents processed per second and the peak memory allocated by the stage (measured with tracemalloc).
+The results are printed (or written to a file) as JSON; a previous result file may be passed with '--compare' to print the ratio of the times.
+
+Example:
+    python benchmark_voting.py --agents 1000 100000 --alternatives 5 50 --output results.json
+    python benchmark_voting.py --agents 1000 100000 --alternatives 5 50 --compare results.json
+'''
+
+
+MODELS = ('ic', 'mallows', 'pl')
+STAGES = ('generatePreferences', 'scoringRule', 'plurality', 'veto', 'borda', 'harmonic', 'STV', 'rangeVoting', 'tieBreak')
+
+# Number of calls of 'tieBreak' which are timed together, because a single call is too fast to be measured
+TIE_BREAK_CALLS = 1000
+
+
+
+
+def impartialCulture(noOfAgents, noOfAlternatives, rng):
+
+    '''
+    Output: an agents x alternatives matrix of independent uniform valuations
+    '''
+
+    return rng.random((noOfAgents, noOfAlternatives))
+
+
+
+
+def mallows(noOfAgents, noOfAlternatives, rng, phi=0.8):
+
+    '''
+    Output: an agents x alternatives matrix of valuations, whose rankings follow the Mallows model with the reference ranking (1, 2, ... m)
+
+    The rankings are sampled with the repeated insertion method: alternative i (counting from 0) is inserted at position j of the
+    ranking of the first i alternatives with probability proportional to phi^(i - j).
+    The valuation of an alternative is m minus its position, so that the valuations give exactly the sampled ranking.
+    '''
+
+    # position[agent, alternative] is the position of the alternative in the ranking of the agent
+    position = np.zeros((noOfAgents, noOfAlternatives), dtype=np.int64)
+
+    for i in range(1, noOfAlternatives):
+
+        insertionWeights = phi ** np.arange(i, -1, -1, dtype=np.float64)
+        cumulativeProbability = np.cumsum(insertionWeights) / insertionWeights.sum()
+        insertionPosition = np.minimum(np.searchsorted(cumulativeProbability, rng.random(noOfAgents), side='right'), i)
+
+        # The alternatives at or after the insertion position move one position down
+        position[:, :i] += position[:, :i] >= insertionPosition[:, None]
+        position[:, i] = insertionPosition
+
+    return (noOfAlternatives - position).astype(np.float64)
+
+
+
+
+def plackettLuce(noOfAgents, noOfAlternatives, rng):
+
+    '''
+    Output: an agents x alternatives matrix of valuations, whose rankings follow the Plackett-Luce model
+
+    The weights of the alternatives are random; adding Gumbel noise to the logarithm of the weights and sorting gives
+    a Plackett-Luce ranking, so the noisy values are used directly as the valuations.
+    '''
+
+    logWeights = np.log(rng.random(noOfAlternatives) + 0.01)
+
+    return logWeights + rng.gumbel(size=(noOfAgents, noOfAlternatives))
+
+
+
+
+def generateValuations(model, noOfAgents, noOfAlternatives, rng, phi=0.8):
+
+    if model == 'ic':
+        return impartialCulture(noOfAgents, noOfAlternatives, rng)
+
+    elif model == 'mallows':
+        return mallows(noOfAgents, noOfAlternatives, rng, phi)
+
+    return plackettLuce(noOfAgents, noOfAlternatives, rng)
+
+
+
+
+def measure(function, memory):
+
+    '''
+    Input: a function without arguments; True if the peak memory shall be measured
+
+    Output: the seconds taken by the function, and the peak memory in bytes allocated while it runs (None if not measured)
+
+    The time is measured without tracemalloc, which slows down the program; the function is run a second time to measure the memory
+    '''
+
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+
+    peakMemory = None
+
+    if memory:
+        tracemalloc.start()
+        function()
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return seconds, peakMemory
+
+
+
+
+def benchmarkElection(model, noOfAgents, noOfAlternatives, rng, phi=0.8, memory=True):
+
+    '''
+    Output: a list of results, one for each stage in STAGES
+    '''
+
+    valuations = generateValuations(model, noOfAgents, noOfAlternatives, rng, phi)
+    scoreVector = rng.integers(0, noOfAlternatives, noOfAlternatives).tolist()
+    allAlternatives = list(range(1, noOfAlternatives + 1))
+
+    preferenceProfile = vT.generatePreferences(valuations)
+
+    def runRule(rule):
+
+        # The position counts and the results of the rules are stored after the first call; they are removed so that each rule is timed from the start
+        preferenceProfile._positionCounts = None
+        vT.clearResultCache()
+
+        if rule == 'scoringRule':
+            vT.scoringRule(preferenceProfile, list(scoreVector), 'max')
+
+        elif rule == 'rangeVoting':
+            vT.rangeVoting(valuations, 'max')
+
+        else:
+            getattr(vT, rule)(preferenceProfile, 'max')
+
+    def runTieBreak():
+
+        for agent in range(1, TIE_BREAK_CALLS + 1):
+            vT.tieBreak((agent - 1) % noOfAgents + 1, allAlternatives, preferenceProfile)
+
+    results = []
+
+    for stage in STAGES:
+
+        if stage == 'generatePreferences':
+            seconds, peakMemory = measure(lambda: vT.generatePreferences(valuations), memory)
+
+        elif stage == 'tieBreak':
+            seconds, peakMemory = measure(runTieBreak, memory)
+
+        else:
+            seconds, peakMemory = measure(lambda: runRule(stage), memory)
+
+        result = {
+            'model': model,
+            'agents': noOfAgents,
+            'alternatives': noOfAlternatives,
+            'uniqueRankings': len(preferenceProfile.rankings),
+            'stage': stage,
+            'seconds': seconds,
+            'peakMemoryBytes': peakMemory,
+        }
+
+        if stage == 'tieBreak':
+            result['callsPerSecond'] = TIE_BREAK_CALLS / seconds if seconds else None
+        else:
+            result['agentsPerSecond'] = noOfAgents / seconds if seconds else None
+
+        results.append(result)
+
+    return results
+
+
+
+
+def compareResults(results, previousResults):
+
+    '''
+    Output: a list with the ratio of the time of each stage to its time in the previous results, for the stages found in both;
+            a ratio larger than 1 means the stage has become slower
+    '''
+
+    key = lambda result: (result['model'], result['agents'], result['alternatives'], result['stage'])
+    previousSeconds = {key(result): result['seconds'] for result in previousResults}
+
+    comparison = []
+
+    for result in results:
+
+        if key(result) in previousSeconds and previousSeconds[key(result)]:
+            comparison.append(dict(zip(('model', 'agents', 'alternatives', 'stage'), key(result)), ratio=result['seconds'] / previousSeconds[key(result)]))
+
+    return comparison
+
+
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description="Benchmark of the voting rules in 'voting.py' on synthetic elections")
+    parser.add_argument('--models', nargs='+', choices=MODELS, default=list(MODELS), help='models used to generate the valuations')
+    parser.add_argument('--agents', nargs='+', type=int, default=[1000, 10000], help='numbers of agents, e.g. 1000 to 10000000')
+    parser.add_argument('--alternatives', nargs='+', type=int, default=[3, 10, 50], help='numbers of alternatives, e.g. 3 to 500')
+    parser.add_argument('--phi', type=float, default=0.8, help='dispersion of the Mallows model, between 0 and 1')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random number generator')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure the peak memory; each stage is then run only once')
+    parser.add_argument('--output', help='file to write the JSON results; the results are printed if it is not given')
+    parser.add_argument('--compare', help='JSON results of a previous run, to compare the times with')
+    arguments = parser.parse_args(arguments)
+
+    rng = np.random.default_rng(arguments.seed)
+    results = []
+
+    for model in arguments.models:
+        for noOfAgents in arguments.agents:
+            for noOfAlternatives in arguments.alternatives:
+                results.extend(benchmarkElection(model, noOfAgents, noOfAlternatives, rng, arguments.phi, not arguments.no_memory))
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'seed': arguments.seed,
+        },
+        'results': results,
+    }
+
+    if arguments.compare:
+        with open(arguments.compare) as previousFile:
+            report['comparison'] = compareResults(results, json.load(previousFile)['results'])
+
+    if arguments.output:
+        with open(arguments.output, 'w') as outputFile:
+            json.dump(report, outputFile, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    return report
+
+
+
+
+if __name__ == '__main__':
+    main()
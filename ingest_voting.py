@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import voting as vT
+from run_voting import tieBreakArgument, scoreArgument, jsonValue
+
+'''
+This file reads the ballots of many sources (e.g. one file per precinct) concurrently, and runs the voting rules on all of them together
+
+The sources are the 'xlsx', 'csv' and binary profile ('.vpf') files of a directory, in the order of their names.
+Each file is parsed in a separate process of a pool, because parsing is done by python code (openpyxl, the csv module) and cannot run
+in parallel threads; asyncio hands the files to the processes and collects the profiles which they return:
+
+    the names of the files are put in a bounded queue, so only a few files are waiting for a process at a time
+    each of the 'workers' tasks takes a file from the queue, parses it in the process pool, and puts the profile in a queue of results
+    the profiles are merged in the order of the file names, as soon as all the files before them are merged, whatever the order in which
+    the processes finish; so the agents of the first file are numbered 1, 2, ... and the agents of the next file are numbered after them
+    a file is given to the workers only while fewer than 'queue size' files are parsed or waiting to be merged, so if an early file is slow,
+    the workers wait for it instead of parsing all the later files, and the profiles which are not merged yet do not fill the memory
+
+The voting rules run once, after all the sources are merged. The winners and the scores are printed as JSON, the same as 'run_voting.py'.
+
+Example:
+    python ingest_voting.py precincts/ --rules plurality borda STV --tie-break min --workers 4
+'''
+
+
+SOURCE_EXTENSIONS = ('.xlsx', '.csv', vT.PROFILE_EXTENSION)
+
+# Number of files which are parsed or waiting to be merged at a time, for each worker
+QUEUE_SIZE_PER_WORKER = 2
+
+
+
+
+def sourceFiles(directory) -> list:
+
+    '''
+    Output: the paths of the files of the directory which contain ballots, sorted by name
+    '''
+
+    fileNames = sorted(fileName for fileName in os.listdir(directory) if fileName.lower().endswith(SOURCE_EXTENSIONS))
+
+    return [os.path.join(directory, fileName) for fileName in fileNames]
+
+
+
+
+def parseSource(path, chunkSize) -> vT.PreferenceProfile:
+
+    '''
+    Runs in a process of the pool: generates the preference profile of one file, and counts the positions of the alternatives,
+    so that the counts are added when the profiles are merged
+
+    The valuations stored in a binary profile file are not needed to merge the profiles, so they are dropped,
+    and NOT copied back to the main process with the profile
+    '''
+
+    profile = vT.generatePreferences(path, chunkSize)
+    profile.positionCounts()
+
+    if getattr(profile, 'valuations', None) is not None:
+        profile.valuations = None
+
+    return profile
+
+
+
+
+async def ingestSources(paths, executor, workers, chunkSize=vT.CHUNK_SIZE, queueSize=None) -> vT.PreferenceProfile:
+
+    '''
+    Input: the paths of the files, in the order in which their agents are numbered;
+            a pool of processes (or threads) which parses the files;
+            the number of files parsed at the same time;
+            an optional number of rows to read at a time;
+            an optional size of the queues, which is also the largest number of files parsed or waiting to be merged at a time;
+            QUEUE_SIZE_PER_WORKER x workers if it is not given
+
+    Output: the merged PreferenceProfile of all the files; False if a file cannot be read,
+            OR if its number of alternatives is not the same as the number of alternatives of the files before it
+    '''
+
+    loop = asyncio.get_running_loop()
+    queueSize = queueSize or QUEUE_SIZE_PER_WORKER * workers
+
+    pendingSources = asyncio.Queue(maxsize=queueSize)
+    parsedProfiles = asyncio.Queue(maxsize=queueSize)
+
+    # The number of sources which are given to the workers and are not merged yet; the sources are given in order,
+    # so the next source to merge is always one of them, and the merge releases a place for the next source
+    sourcesInFlight = asyncio.Semaphore(queueSize)
+
+    async def produceSources():
+
+        for sourceIndex, path in enumerate(paths):
+            await sourcesInFlight.acquire()
+            await pendingSources.put((sourceIndex, path))
+
+        # one stop signal for each worker task
+        for _ in range(workers):
+            await pendingSources.put(None)
+
+    async def parseSources():
+
+        while True:
+
+            source = await pendingSources.get()
+
+            if source is None:
+                return
+
+            sourceIndex, path = source
+
+            try:
+                profile = await loop.run_in_executor(executor, parseSource, path, chunkSize)
+
+            except Exception as error:
+                print(f"Could not read '{path}': {error}")
+                profile = None
+
+            await parsedProfiles.put((sourceIndex, path, profile))
+
+    tasks = [asyncio.create_task(produceSources())] + [asyncio.create_task(parseSources()) for _ in range(workers)]
+
+    # The profiles are merged in the order of the files; a profile which arrives before the profiles of the earlier files waits in 'waitingProfiles'
+    profileMerger = vT.ProfileMerger()
+    waitingProfiles = {}
+    nextSource = 0
+    failedSources = []
+    noOfAlternatives = None
+
+    try:
+
+        for _ in range(len(paths)):
+
+            sourceIndex, path, profile = await parsedProfiles.get()
+            waitingProfiles[sourceIndex] = (path, profile)
+
+            while nextSource in waitingProfiles:
+
+                path, profile = waitingProfiles.pop(nextSource)
+
+                if profile is None:
+                    failedSources.append(path)
+
+                elif len(profile) and noOfAlternatives is not None and profile.noOfAlternatives != noOfAlternatives:
+                    # The rankings of the file cannot be merged with the rankings of the files before it
+                    print(f"'{path}' has {profile.noOfAlternatives} alternatives, but the sources before it have {noOfAlternatives}")
+                    failedSources.append(path)
+
+                else:
+                    profileMerger.add(profile)
+
+                    # A file without agents does not know the number of alternatives
+                    if len(profile) and noOfAlternatives is None:
+                        noOfAlternatives = profile.noOfAlternatives
+
+                nextSource += 1
+                sourcesInFlight.release()
+
+        await asyncio.gather(*tasks)
+
+    finally:
+
+        for task in tasks:
+            task.cancel()
+
+    if failedSources:
+        # The election is NOT run on a part of the ballots
+        print(f"{len(failedSources)} source(s) could not be read or merged: {failedSources}")
+        return False
+
+    return profileMerger.profile()
+
+
+
+
+async def runElection(arguments):
+
+    '''
+    Output: the report of the election as a dictionary, or None if there are no sources, a source cannot be read or a voting rule cannot be run
+    '''
+
+    paths = sourceFiles(arguments.directory)
+
+    if not paths:
+        print(f"There are no 'xlsx', 'csv' or '{vT.PROFILE_EXTENSION}' files in '{arguments.directory}'")
+        return None
+
+    workers = arguments.workers or os.cpu_count() or 1
+    timings = {}
+
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        preferenceProfile = await ingestSources(paths, executor, workers, arguments.chunk_size or vT.CHUNK_SIZE, arguments.queue_size)
+
+    timings['ingest'] = time.perf_counter() - start
+
+    if preferenceProfile is False:
+        return None
+
+    # scoringRule needs a score vector, so it is run only if a score vector is given
+    rules = arguments.rules or [rule for rule in vT.RULES if rule != 'scoringRule' or arguments.score_vector]
+
+    start = time.perf_counter()
+    result = vT.evaluate(preferenceProfile, rules, arguments.tie_break, arguments.score_vector)
+    timings['rules'] = time.perf_counter() - start
+
+    if result is False:
+        return None
+
+    return {
+        'sources': paths,
+        'agents': len(preferenceProfile),
+        'alternatives': preferenceProfile.noOfAlternatives,
+        'uniqueRankings': len(preferenceProfile.rankings),
+        'tieBreak': arguments.tie_break,
+        'winners': result.winners,
+        'scores': result.scores,
+        'timings': timings,
+    }
+
+
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description="Read the ballots of all the files of a directory concurrently and choose the winner of the election")
+    parser.add_argument('directory', help="directory with the 'xlsx', 'csv' and '.vpf' files of the ballots")
+    parser.add_argument('--rules', nargs='+', help="voting rules to run; all the rules by default ('scoringRule' only if a score vector is given)")
+    parser.add_argument('--tie-break', type=tieBreakArgument, default='max', help="'max', 'min' OR an agent number (agents are numbered file by file)")
+    parser.add_argument('--score-vector', nargs='+', type=scoreArgument, help="score vector of 'scoringRule', one score per alternative")
+    parser.add_argument('--workers', type=int, help='number of files parsed at the same time; the number of processors by default')
+    parser.add_argument('--queue-size', type=int, help=f'number of files parsed or waiting to be merged at a time; {QUEUE_SIZE_PER_WORKER} x workers by default')
+    parser.add_argument('--chunk-size', type=int, help='number of rows read at a time')
+    parser.add_argument('--output', help='file to write the JSON report; the report is printed if it is not given')
+    arguments = parser.parse_args(arguments)
+
+    report = asyncio.run(runElection(arguments))
+
+    if report is None:
+        return 1
+
+    if arguments.output:
+        with open(arguments.output, 'w') as outputFile:
+            json.dump(report, outputFile, indent=2, default=jsonValue)
+    else:
+        print(json.dumps(report, indent=2, default=jsonValue))
+
+    return 0
+
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
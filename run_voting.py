@@ -1,50 +1,253 @@
-import voting as vT
-
-'''
-This file may be used to run 'voting.py' 
-
-This file loads a workbook using openpyxl library, which is already imported in 'voting.py'
-The workbook shall contain evaluations provided by agents to different available alternatives
-Evaluations shall be numerical values, the rows shall correspond to agents and the columns shall correspond to the alternatives
-
-Various voting rules may be used to chose a winning alternative.
-To use a voting rule, the corresponding command may be uncommented
-
-'''
-
-#Load the 'xlsx' file as a workbook
-valuationsBook = vT.op.load_workbook('votingTest.xlsx')
-
-# open the worksheet
-valuationsSheet = valuationsBook.active
-
-# Call the function to generate a preference profile
-preferenceProfile = vT.generatePreferences(valuationsSheet)
-
-#Print the preference profile
-print(f'The preference profile generated based on the votes is: {preferenceProfile}')
-
-
-# Scoring Rule:
-scoreVector = [1, 2, 4, 3, 2]
-winnerAlternative = vT.scoringRule(preferenceProfile, scoreVector, 1)
-print(f"winnerAlternative by Scoring rule is {winnerAlternative}")
-
-
-#Plurality
-print("Winner by plurality", vT.plurality(preferenceProfile, 6))
-
-#Veto
-print("Winner by Veto", vT.veto(preferenceProfile, 6))
-
-#Borda
-print("Winner by Borda", vT.borda(preferenceProfile, 'min'))
-
-#Harmonic
-print("Winner by Harmonic is", vT.harmonic(preferenceProfile, 'max'))
-
-#STV
-print("Winner by STV", vT.STV(preferenceProfile, 6))
-
-#Range Voting
-print("Winner by Range Voting", vT.rangeVoting(valuationsSheet, 1))
+import argparse
+import json
+import sys
+import time
+from fractions import Fraction
+
+'''
+This file may be used to run 'voting.py' from the command line
+
+The input is the path of a file with the valuations: an 'xlsx' workbook, a 'csv' file with the same layout,
+OR a binary profile file ('.vpf') written by 'saveProfile'.
+The workbook shall contain evaluations provided by agents to different available alternatives
+Evaluations shall be numerical values, the rows shall correspond to agents and the columns shall correspond to the alternatives
+
+The rows are read in chunks (a workbook is opened in read-only mode), and the preference profile is made in the same pass;
+the selected voting rules are then run on the profile, and the winners, the total scores and the time of every stage are printed as JSON:
+    ingest      - reading and parsing the rows of the file (or mapping the binary file)
+    preferences - making the preference profile from the rows which are read
+    rules       - the time of each voting rule
+With '--metrics', the report also contains the stages recorded inside 'voting.py' (see 'Metrics'), e.g. the time of ranking the rows,
+of the position counts and of each rule, the number of rows read and the number of STV rounds; '--trace-memory' adds the peak memory of each stage.
+With several workers, a 'csv' file is read by separate processes (an 'xlsx' file is always read by one process), so reading and making the profile are timed together as 'preferences'.
+
+'voting.py' (and openpyxl) is imported only after the arguments are read, so '--help' does not wait for the imports.
+
+Example:
+    python run_voting.py votingTest.xlsx
+    python run_voting.py votingTest.xlsx --rules borda STV rangeVoting --tie-break 1
+    python run_voting.py votingTest.xlsx --rules scoringRule --score-vector 1 2 4 3 2 --tie-break min
+    python run_voting.py votes.csv --workers 4 --chunk-size 50000 --save-profile votes.vpf
+    python run_voting.py votes.vpf --profile
+    python run_voting.py votes.csv --rules STV --metrics --trace-memory
+'''
+
+
+
+
+def tieBreakArgument(option):
+
+    '''
+    Output: 'max' OR 'min', OR the agent number as an integer
+    '''
+
+    if option in ('max', 'min'):
+        return option
+
+    try:
+        return int(option)
+
+    except ValueError:
+        raise argparse.ArgumentTypeError("choose 'max' OR 'min' OR an agent number as the tie break option")
+
+
+
+
+def scoreArgument(score):
+
+    '''
+    Output: the score as an integer if possible, otherwise as an exact fraction (e.g. '1/3' OR '0.5')
+    '''
+
+    try:
+        score = Fraction(score)
+
+    except (ValueError, ZeroDivisionError):
+        raise argparse.ArgumentTypeError(f"'{score}' is not a number")
+
+    return int(score) if score.denominator == 1 else score
+
+
+
+
+def jsonValue(value):
+
+    '''
+    Converts the scores to types which can be written as JSON; an exact fraction is written as a float
+    '''
+
+    if isinstance(value, Fraction):
+        return float(value)
+
+    if hasattr(value, 'item'):
+        # a numpy number
+        return value.item()
+
+    raise TypeError(f"{type(value).__name__} cannot be written as JSON")
+
+
+
+
+def timedChunks(chunks, timings):
+
+    '''
+    Input: an iterable of chunks of rows; the dictionary of timings
+
+    Output: yields the same chunks; the time spent reading each chunk is added to timings['ingest']
+    '''
+
+    chunks = iter(chunks)
+
+    while True:
+
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        timings['ingest'] += time.perf_counter() - start
+
+        if chunk is None:
+            return
+
+        yield chunk
+
+
+
+
+def readProfile(vT, path, chunkSize, workers, timings):
+
+    '''
+    Output: the preference profile of the file; timings['ingest'] and timings['preferences'] are set
+    '''
+
+    timings['ingest'] = 0.0
+    start = time.perf_counter()
+
+    if path.lower().endswith(vT.PROFILE_EXTENSION):
+        # nothing is parsed, the arrays are used from the mapped file
+        preferenceProfile = vT.loadProfile(path)
+        timings['ingest'] = time.perf_counter() - start
+        timings['preferences'] = 0.0
+
+        return preferenceProfile
+
+    # an 'xlsx' file is read by one process whatever the number of workers, see 'shardableSource'
+    if workers is not None and workers > 1 and vT.shardableSource(path):
+        preferenceProfile = vT.generatePreferences(path, chunkSize, workers)
+        timings['ingest'] = None
+
+    else:
+        preferenceProfile = vT.preferencesFromChunks(timedChunks(vT.valuationChunks(path, chunkSize), timings))
+
+    timings['preferences'] = time.perf_counter() - start - (timings['ingest'] or 0.0)
+
+    return preferenceProfile
+
+
+
+
+def runElection(vT, arguments, importSeconds):
+
+    '''
+    Output: the report of the election as a dictionary, or None if a voting rule cannot be run on the input
+    '''
+
+    timings = {'import': importSeconds}
+    preferenceProfile = readProfile(vT, arguments.input, arguments.chunk_size or vT.CHUNK_SIZE, arguments.workers, timings)
+
+    if arguments.save_profile:
+        start = time.perf_counter()
+        vT.saveProfile(arguments.save_profile, preferenceProfile)
+        timings['saveProfile'] = time.perf_counter() - start
+
+    # scoringRule needs a score vector, so it is run only if a score vector is given
+    rules = arguments.rules or [rule for rule in vT.RULES if rule != 'scoringRule' or arguments.score_vector]
+
+    timings['rules'] = {}
+    winners = {}
+    scores = {}
+
+    for rule in rules:
+
+        start = time.perf_counter()
+        result = vT.evaluate(preferenceProfile, [rule], arguments.tie_break, arguments.score_vector)
+        timings['rules'][rule] = time.perf_counter() - start
+
+        if result is False:
+            return None
+
+        winners.update(result.winners)
+        scores.update(result.scores)
+
+    return {
+        'input': arguments.input,
+        'agents': len(preferenceProfile),
+        'alternatives': preferenceProfile.noOfAlternatives,
+        'uniqueRankings': len(preferenceProfile.rankings),
+        'tieBreak': arguments.tie_break,
+        'winners': winners,
+        'scores': scores,
+        'timings': timings,
+    }
+
+
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description="Choose the winner of an election with the voting rules of 'voting.py'")
+    parser.add_argument('input', nargs='?', default='votingTest.xlsx', help="'xlsx', 'csv' OR binary profile ('.vpf') file with the valuations")
+    parser.add_argument('--rules', nargs='+', help="voting rules to run; all the rules by default ('scoringRule' only if a score vector is given)")
+    parser.add_argument('--tie-break', type=tieBreakArgument, default='max', help="'max', 'min' OR an agent number")
+    parser.add_argument('--score-vector', nargs='+', type=scoreArgument, help="score vector of 'scoringRule', one score per alternative")
+    parser.add_argument('--chunk-size', type=int, help='number of rows read at a time')
+    parser.add_argument('--workers', type=int, help="number of processes reading a 'csv' file in parallel ('xlsx' files are read by one process)")
+    parser.add_argument('--save-profile', help="write the preference profile to this binary ('.vpf') file")
+    parser.add_argument('--profile', action='store_true', help='run under cProfile and print the slowest functions to stderr')
+    parser.add_argument('--metrics', action='store_true', help="record the stages inside 'voting.py' and add them to the report")
+    parser.add_argument('--trace-memory', action='store_true', help='with --metrics, trace the peak memory of each stage (slower)')
+    parser.add_argument('--output', help='file to write the JSON report; the report is printed if it is not given')
+    arguments = parser.parse_args(arguments)
+
+    start = time.perf_counter()
+
+    if arguments.profile:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # the import is timed separately, because it is the same for every input
+    import voting as vT
+    importSeconds = time.perf_counter() - start
+
+    if arguments.metrics or arguments.trace_memory:
+        vT.enableMetrics(traceMemory=arguments.trace_memory)
+
+    report = runElection(vT, arguments, importSeconds)
+    recordedMetrics = vT.disableMetrics()
+
+    if arguments.profile:
+        profiler.disable()
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(25)
+
+    if report is None:
+        return 1
+
+    report['timings']['total'] = time.perf_counter() - start
+
+    if recordedMetrics is not None:
+        report['metrics'] = recordedMetrics.report()
+
+    if arguments.output:
+        with open(arguments.output, 'w') as outputFile:
+            json.dump(report, outputFile, indent=2, default=jsonValue)
+    else:
+        print(json.dumps(report, indent=2, default=jsonValue))
+
+    return 0
+
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import ingest_voting as iV
+import voting as vT
+
+'''
+Tests of 'ingest_voting.py'; run with 'python -m pytest'
+
+The sources are parsed in threads, except in 'test_mainWritesTheReport', so that the tests can replace 'parseSource'.
+'''
+
+
+
+
+def writeSources(directory, rowCounts, noOfAlternatives=4, seed=0) -> np.ndarray:
+
+    '''
+    Output: the valuations of all the 'csv' files written in the directory, one file per number of rows, in the order of the file names
+    '''
+
+    generator = np.random.default_rng(seed)
+    allValuations = []
+
+    for sourceIndex, noOfRows in enumerate(rowCounts):
+        valuations = generator.integers(0, 5, (noOfRows, noOfAlternatives))
+        np.savetxt(directory / f'source{sourceIndex:02d}.csv', valuations, delimiter=',', fmt='%d')
+        allValuations.append(valuations)
+
+    return np.concatenate(allValuations)
+
+
+
+
+def ingest(paths, workers=2, queueSize=None):
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return asyncio.run(iV.ingestSources(paths, executor, workers, 16, queueSize))
+
+
+
+
+def test_sourcesAreMergedInTheOrderOfTheFiles(tmp_path, monkeypatch):
+
+    valuations = writeSources(tmp_path, [30, 1, 17, 40, 5])
+    paths = iV.sourceFiles(tmp_path)
+    parseSource = iV.parseSource
+
+    # the first files are the slowest, so the profiles arrive in the reverse order
+    def reversedParse(path, chunkSize):
+        time.sleep(0.05 * (len(paths) - paths.index(path)))
+        return parseSource(path, chunkSize)
+
+    monkeypatch.setattr(iV, 'parseSource', reversedParse)
+
+    profile = ingest(paths, workers=len(paths))
+    expectedProfile = vT.generatePreferences(valuations)
+
+    # the agents of each file are numbered after the agents of the files before it
+    assert dict(profile.items()) == dict(expectedProfile.items())
+    assert np.array_equal(profile.valuationSums, expectedProfile.valuationSums)
+    assert np.array_equal(profile.positionCounts(), expectedProfile.positionCounts())
+
+
+
+
+def test_slowSourceBoundsTheSourcesInFlight(tmp_path, monkeypatch):
+
+    writeSources(tmp_path, [3] * 12)
+    paths = iV.sourceFiles(tmp_path)
+    parseSource = iV.parseSource
+    startedSources = []
+    startedDuringFirstSource = []
+
+    # while the first file is parsed, the other worker may only parse the files which fit in the queue size
+    def slowFirstParse(path, chunkSize):
+
+        startedSources.append(path)
+
+        if path == paths[0]:
+            time.sleep(0.3)
+            startedDuringFirstSource.append(len(startedSources))
+
+        return parseSource(path, chunkSize)
+
+    monkeypatch.setattr(iV, 'parseSource', slowFirstParse)
+
+    profile = ingest(paths, workers=2, queueSize=3)
+
+    assert len(profile) == 36
+    assert startedDuringFirstSource == [3]
+    assert sorted(startedSources) == paths
+
+
+
+
+def test_failedAndMismatchedSources(tmp_path, capsys):
+
+    writeSources(tmp_path, [4, 4])
+    (tmp_path / 'source05.csv').write_text('1,2,x\n')
+
+    # a file which cannot be read fails the election, and is named
+    assert ingest(iV.sourceFiles(tmp_path)) is False
+    assert "source05.csv" in capsys.readouterr().out
+
+    # a file with another number of alternatives cannot be merged, and is named
+    (tmp_path / 'source05.csv').unlink()
+    np.savetxt(tmp_path / 'source07.csv', np.ones((3, 5)), delimiter=',', fmt='%d')
+
+    assert ingest(iV.sourceFiles(tmp_path)) is False
+    assert "'" + str(tmp_path / 'source07.csv') + "' has 5 alternatives, but the sources before it have 4" in capsys.readouterr().out
+
+
+
+
+def test_mainWritesTheReport(tmp_path):
+
+    sourceDirectory = tmp_path / 'sources'
+    sourceDirectory.mkdir()
+    valuations = writeSources(sourceDirectory, [20, 7, 13])
+
+    # one of the sources is a binary profile file, which is read with its valuations
+    (sourceDirectory / 'source01.csv').unlink()
+    sourceValuations = valuations[20:27]
+    vT.saveProfile(str(sourceDirectory / ('source01' + vT.PROFILE_EXTENSION)), vT.generatePreferences(sourceValuations), sourceValuations)
+
+    outputPath = tmp_path / 'report.json'
+    assert iV.main([str(sourceDirectory), '--rules', 'borda', 'STV', 'rangeVoting', '--tie-break', '21', '--workers', '2', '--output', str(outputPath)]) == 0
+
+    report = json.loads(outputPath.read_text())
+    expected = vT.evaluate(valuations, ['borda', 'STV', 'rangeVoting'], 21)
+
+    assert report['agents'] == 40
+    assert report['winners'] == expected.winners
+
+    # a directory without sources is reported, and the exit code is 1
+    emptyDirectory = tmp_path / 'empty'
+    emptyDirectory.mkdir()
+    assert iV.main([str(emptyDirectory)]) == 1
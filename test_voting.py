@@ -0,0 +1,837 @@
+import random
+from fractions import Fraction
+
+import numpy as np
+import openpyxl as op
+import pytest
+
+import voting as vT
+
+'''
+Tests of 'voting.py'; run with 'python -m pytest'
+
+The rules are compared with small reference implementations which work on the dictionary of preferences, one agent at a time,
+the same way the first version of 'voting.py' did; the vectorised rules shall give the same winners for every tie break option.
+'''
+
+
+# Number of random profiles compared with the reference implementations
+NO_OF_RANDOM_PROFILES = 60
+
+
+
+
+class Sheet:
+
+    '''
+    A worksheet with the rows of valuations in the memory, which has the same methods as an openpyxl worksheet
+    '''
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iter_rows(self, min_row=1, values_only=True):
+        return iter(self.rows)
+
+
+
+
+def randomRows(seed):
+
+    '''
+    Output: the rows of a random worksheet; only a few different valuations are used, so that there are many ties
+    '''
+
+    generator = random.Random(seed)
+    noOfAlternatives = generator.randint(2, 6)
+    noOfAgents = generator.randint(1, 30)
+    levels = generator.choice([2, 3, 10])
+
+    return [tuple(generator.randint(0, levels) for _ in range(noOfAlternatives)) for _ in range(noOfAgents)]
+
+
+
+
+def referencePreferences(rows) -> dict:
+
+    '''
+    Output: the dictionary of preferences; in case of equal valuations, the alternative with the larger number is preferred
+    '''
+
+    return {agent: sorted(range(len(row), 0, -1), key=lambda alternative: -row[alternative - 1]) for agent, row in enumerate(rows, start=1)}
+
+
+
+
+def referenceTieBreak(option, bestAlternatives, preferenceProfile):
+
+    '''
+    Output: the winner among the best alternatives: the largest OR the smallest number, OR the first of them in the preferences of the agent
+    '''
+
+    if len(bestAlternatives) == 1:
+        return bestAlternatives[0]
+
+    if option == 'max':
+        return max(bestAlternatives)
+
+    if option == 'min':
+        return min(bestAlternatives)
+
+    return next(alternative for alternative in preferenceProfile[option] if alternative in bestAlternatives)
+
+
+
+
+def referenceScoringRule(preferenceProfile, scoreVector, tieBreakOption):
+
+    '''
+    Output: the winner of the scoring rule, adding the scores of one agent at a time
+    '''
+
+    scoreVector = sorted(scoreVector, reverse=True)
+    totalScore = {alternative: 0 for alternative in next(iter(preferenceProfile.values()))}
+
+    for preferences in preferenceProfile.values():
+
+        for position, alternative in enumerate(preferences):
+            totalScore[alternative] += scoreVector[position]
+
+    maxScore = max(totalScore.values())
+
+    return referenceTieBreak(tieBreakOption, sorted(alternative for alternative in totalScore if totalScore[alternative] == maxScore), preferenceProfile)
+
+
+
+
+def referenceSTV(preferenceProfile, tieBreakOption):
+
+    '''
+    Output: the winner of STV; all the alternatives which are least often in the first position are deleted in each round,
+            and the tie break chooses among the alternatives deleted in the last round
+    '''
+
+    remainingProfile = {agent: list(preferences) for agent, preferences in preferenceProfile.items()}
+
+    while True:
+
+        firstPositions = {alternative: 0 for alternative in next(iter(remainingProfile.values()))}
+
+        for preferences in remainingProfile.values():
+            firstPositions[preferences[0]] += 1
+
+        fewestVotes = min(firstPositions.values())
+        deletedAlternatives = sorted(alternative for alternative in firstPositions if firstPositions[alternative] == fewestVotes)
+
+        if len(deletedAlternatives) == len(firstPositions):
+            return referenceTieBreak(tieBreakOption, deletedAlternatives, preferenceProfile)
+
+        for preferences in remainingProfile.values():
+
+            for alternative in deletedAlternatives:
+                preferences.remove(alternative)
+
+
+
+
+def tieBreakOptions(preferenceProfile):
+
+    '''
+    Output: the tie break options to test: 'max', 'min', the first and the last agent
+    '''
+
+    agents = list(preferenceProfile)
+
+    return ['max', 'min', agents[0], agents[-1]]
+
+
+
+
+@pytest.mark.parametrize('seed', range(NO_OF_RANDOM_PROFILES))
+def test_positionalRulesMatchReference(seed):
+
+    rows = randomRows(seed)
+    preferenceProfile = referencePreferences(rows)
+    profile = vT.generatePreferences(Sheet(rows))
+    noOfAlternatives = len(rows[0])
+
+    assert {agent: list(preferences) for agent, preferences in profile.items()} == preferenceProfile
+
+    # the score vector has few different scores, so that some alternatives have the same total score
+    generator = random.Random(seed)
+    scoreVector = [generator.randint(0, 3) for _ in range(noOfAlternatives)]
+    referenceVectors = {
+        'plurality': [1] + [0] * (noOfAlternatives - 1),
+        'veto': [1] * (noOfAlternatives - 1) + [0],
+        'borda': list(range(noOfAlternatives - 1, -1, -1)),
+        'harmonic': [Fraction(1, position) for position in range(1, noOfAlternatives + 1)],
+    }
+
+    for tieBreakOption in tieBreakOptions(preferenceProfile):
+
+        expectedWinner = referenceScoringRule(preferenceProfile, scoreVector, tieBreakOption)
+
+        # the rules accept the dictionary as well as the PreferenceProfile, and the score vector is not modified
+        for inputProfile in (profile, preferenceProfile):
+            givenVector = list(scoreVector)
+            assert vT.scoringRule(inputProfile, givenVector, tieBreakOption) == expectedWinner
+            assert givenVector == scoreVector
+
+        for rule, referenceVector in referenceVectors.items():
+
+            expectedWinner = referenceScoringRule(preferenceProfile, referenceVector, tieBreakOption)
+
+            assert getattr(vT, rule)(profile, tieBreakOption) == expectedWinner
+            assert getattr(vT, rule)(preferenceProfile, tieBreakOption) == expectedWinner
+
+
+
+
+@pytest.mark.parametrize('seed', range(NO_OF_RANDOM_PROFILES))
+def test_STVMatchesReference(seed):
+
+    rows = randomRows(seed)
+    preferenceProfile = referencePreferences(rows)
+    profile = vT.generatePreferences(Sheet(rows))
+
+    for tieBreakOption in tieBreakOptions(preferenceProfile):
+
+        expectedWinner = referenceSTV(preferenceProfile, tieBreakOption)
+
+        assert vT.STV(profile, tieBreakOption) == expectedWinner
+        assert vT.STV(preferenceProfile, tieBreakOption) == expectedWinner
+
+    # the dictionary of the user is not modified by the count
+    assert preferenceProfile == referencePreferences(rows)
+
+
+
+
+def test_STVDeletesAllTheLeastPreferredAlternativesOfARound():
+
+    # round 1: alternative 4 is never first and is deleted; round 2: 1, 2 and 3 are first for one agent each,
+    # so they are all deleted in the last round, and the tie break chooses among them
+    preferenceProfile = {1: [1, 4, 2, 3], 2: [2, 4, 3, 1], 3: [3, 4, 1, 2]}
+
+    assert vT.STV(preferenceProfile, 'max') == 3
+    assert vT.STV(preferenceProfile, 'min') == 1
+    assert vT.STV(preferenceProfile, 2) == 2
+
+    # the agent keys are the numbers of the dictionary, and NOT the positions of the agents
+    assert vT.STV({5: [1, 2, 3], 7: [2, 1, 3]}, 7) == 2
+    assert vT.STV({5: [1, 2, 3], 7: [2, 1, 3]}, 5) == 1
+
+
+
+
+def test_agentTieBreakUsesTheAgentNumbersOfTheDictionary():
+
+    # the agents are NOT numbered 1, 2, ...; the tie break agent is found by its number, and NOT by its position
+    preferenceProfile = {5: [1, 2, 3], 7: [2, 1, 3]}
+
+    for rule in ('plurality', 'borda'):
+        assert getattr(vT, rule)(preferenceProfile, 7) == 2
+        assert getattr(vT, rule)(preferenceProfile, 5) == 1
+
+    assert vT.scoringRule({2: [1, 2, 3], 1: [2, 1, 3]}, [1, 0, 0], 1) == 2
+
+
+
+
+def test_scoringRuleDoesNotSortTheScoreVector():
+
+    scoreVector = [1, 3, 2]
+
+    # the scores are given to the positions from the largest to the smallest: 3 + 2 = 5 for alternative 1
+    assert vT.scoringRule({1: [1, 2, 3], 2: [2, 1, 3]}, scoreVector, 'max') == 2
+    assert vT.scoringRule({1: [1, 2, 3], 2: [3, 1, 2]}, scoreVector, 'max') == 1
+    assert scoreVector == [1, 3, 2]
+
+
+
+
+def test_csvFileMatchesWorksheet(tmp_path):
+
+    rows = randomRows(1)
+    path = tmp_path / 'votes.csv'
+
+    # excel saves 'CSV UTF-8' files with a byte order mark before the first value
+    path.write_bytes(b'\xef\xbb\xbf' + ''.join(','.join(str(value) for value in row) + '\r\n' for row in rows).encode())
+
+    assert list(vT.csvRows(path)) == [tuple(float(value) for value in row) for row in rows]
+
+    csvProfile = vT.generatePreferences(str(path), chunkSize=7)
+    sheetProfile = vT.generatePreferences(Sheet(rows))
+
+    assert dict(csvProfile.items()) == dict(sheetProfile.items())
+    assert np.array_equal(csvProfile.valuationSums, sheetProfile.valuationSums)
+    assert vT.rangeVoting(str(path), 'min', chunkSize=3) == vT.rangeVoting(Sheet(rows), 'min')
+
+    # a blank cell is read as None, the same as openpyxl does
+    path.write_text('1,,3\n\n2,1,\n')
+    assert list(vT.csvRows(path)) == [(1.0, None, 3.0), (2.0, 1.0, None)]
+
+
+
+
+def test_csvShardsMatchOneProcess(tmp_path):
+
+    valuations = np.random.default_rng(5).integers(0, 4, (301, 4))
+    path = str(tmp_path / 'votes.csv')
+    np.savetxt(path, valuations, delimiter=',', fmt='%d')
+
+    # every row is read by exactly one shard, in the order of the file
+    for noOfShards in (1, 2, 3, 7):
+        shardRows = [row for shardIndex in range(noOfShards) for row in vT.csvRows(path, shardIndex, noOfShards)]
+        assert shardRows == [tuple(row) for row in valuations.astype(float).tolist()]
+
+    profile = vT.generatePreferences(path, chunkSize=50)
+
+    for workers in (2, 3):
+
+        shardedProfile = vT.generatePreferences(path, chunkSize=20, workers=workers)
+
+        assert dict(shardedProfile.items()) == dict(profile.items())
+        assert np.array_equal(shardedProfile.positionCounts(), profile.positionCounts())
+        assert np.array_equal(shardedProfile.valuationSums, profile.valuationSums)
+        assert np.array_equal(vT.sumValuations(path, 10, workers=workers), profile.valuationSums)
+        assert vT.rangeVoting(path, 1, workers=workers) == vT.rangeVoting(profile, 1)
+
+
+
+
+def test_xlsxFileIsNotReadInShards(tmp_path):
+
+    rows = randomRows(2)
+    path = str(tmp_path / 'votes.xlsx')
+    workbook = op.Workbook()
+
+    for row in rows:
+        workbook.active.append(row)
+
+    workbook.save(path)
+
+    # with several workers, an 'xlsx' file is read by one process
+    assert dict(vT.generatePreferences(path, workers=3).items()) == dict(vT.generatePreferences(Sheet(rows)).items())
+
+    with pytest.raises(ValueError):
+        next(vT.valuationChunks(path, noOfShards=2))
+
+
+
+
+def test_liveTallyMatchesTheRulesAfterEachBallot():
+
+    rows = randomRows(3)
+    tally = vT.LiveTally(len(rows[0]))
+    rules = ('plurality', 'veto', 'borda', 'harmonic', 'rangeVoting')
+
+    for agent, row in enumerate(rows, start=1):
+
+        assert tally.addBallot(row) == agent
+
+        # the winners of the ballots added so far are the winners of the worksheet with the same rows
+        for tieBreakOption in ('max', 'min', 1, agent):
+            winners = vT.evaluate(Sheet(rows[:agent]), list(rules), tieBreakOption).winners
+            assert {rule: tally.winner(rule, tieBreakOption) for rule in rules} == winners
+
+
+
+
+def test_liveTallyRemovedBallotsCancel():
+
+    tally = vT.LiveTally(3)
+    tally.addBallot((3, 2, 1))
+    tally.addBallot((1, 3, 2))
+    positionCounts = tally.positionCounts.copy()
+
+    # adding and removing a ballot gives back the same totals
+    agent = tally.addBallot((1, 2, 3))
+    assert tally.winner('plurality', 'min') == 1
+    assert tally.removeBallot(agent) is True
+    assert np.array_equal(tally.positionCounts, positionCounts)
+    assert tally.scores('rangeVoting') == [4, 5, 3]
+    assert tally.scores('borda') == [2, 3, 1]
+
+    # adding a ballot for an agent which already has one replaces the ballot
+    tally.addBallot((0, 0, 9), agent=1)
+    assert tally.scores('plurality') == [0, 1, 1]
+    assert tally.winner('plurality', 1) == 3
+
+    assert tally.removeBallot(99) is False
+    assert tally.addBallot((1, 2)) is False
+    assert tally.winner('STV', 'max') is False
+
+
+
+
+@pytest.mark.parametrize('seed', range(0, NO_OF_RANDOM_PROFILES, 6))
+def test_socialRankingStartsWithTheWinner(seed):
+
+    rows = randomRows(seed)
+    preferenceProfile = referencePreferences(rows)
+    noOfAlternatives = len(rows[0])
+
+    for tieBreakOption in tieBreakOptions(preferenceProfile):
+
+        for rule in ('plurality', 'veto', 'borda', 'harmonic', 'STV'):
+
+            ranking = vT.socialRanking(preferenceProfile, rule, tieBreakOption)
+
+            assert ranking[0][0] == getattr(vT, rule)(preferenceProfile, tieBreakOption)
+            assert sorted(alternative for alternative, _ in ranking) == list(range(1, noOfAlternatives + 1))
+
+            # the scores do not increase, and the best k alternatives are the beginning of the full ranking
+            assert all(ranking[i][1] >= ranking[i + 1][1] for i in range(len(ranking) - 1))
+
+            for k in range(1, noOfAlternatives + 1):
+                assert vT.socialRanking(preferenceProfile, rule, tieBreakOption, k) == ranking[:k]
+
+        ranking = vT.socialRanking(Sheet(rows), 'rangeVoting', tieBreakOption)
+        assert ranking[0][0] == vT.rangeVoting(Sheet(rows), tieBreakOption)
+
+
+
+
+def test_socialRankingOfASmallProfile():
+
+    preferenceProfile = {1: [1, 2, 3], 2: [2, 1, 3], 3: [1, 3, 2]}
+
+    assert vT.socialRanking(preferenceProfile, 'borda', 'max') == [(1, 5), (2, 3), (3, 1)]
+    assert vT.socialRanking(preferenceProfile, 'plurality', 'max', 2) == [(1, 2), (2, 1)]
+    assert vT.socialRanking(preferenceProfile, 'veto', 'max') == [(1, 3), (2, 2), (3, 1)]
+
+    # every alternative is first for one agent, so the tie break gives the whole order
+    cycleProfile = {1: [1, 2, 3], 2: [2, 3, 1], 3: [3, 1, 2]}
+
+    assert vT.socialRanking(cycleProfile, 'plurality', 'max') == [(3, 1), (2, 1), (1, 1)]
+    assert vT.socialRanking(cycleProfile, 'plurality', 'min') == [(1, 1), (2, 1), (3, 1)]
+    assert vT.socialRanking(cycleProfile, 'plurality', 2, 2) == [(2, 1), (3, 1)]
+    assert vT.socialRanking(cycleProfile, 'plurality', 'foo') is False
+
+
+
+
+def test_STVEliminationOrder():
+
+    preferenceProfile = {1: [1, 4, 2, 3], 2: [2, 4, 3, 1], 3: [3, 4, 1, 2]}
+
+    # alternative 4 is deleted in the first round, and 1, 2 and 3 together in the last round
+    assert vT.STVEliminationOrder(preferenceProfile) == [[4], [1, 2, 3]]
+    assert vT.socialRanking(preferenceProfile, 'STV', 'min') == [(1, 2), (2, 2), (3, 2), (4, 1)]
+    assert vT.socialRanking(preferenceProfile, 'STV', 3, 1) == [(3, 2)]
+
+
+
+
+def test_pairwiseRulesOfASmallProfile():
+
+    # alternative 1 beats 2 (2 agents to 1) and 3 (3 to 0), and alternative 2 beats 3 (2 to 1)
+    preferenceProfile = {1: [1, 2, 3], 2: [2, 1, 3], 3: [1, 3, 2]}
+    result = vT.evaluate(preferenceProfile, ['condorcet', 'copeland', 'maximin', 'schulze', 'kemeny'], 'min')
+
+    assert result.winners == {'condorcet': 1, 'copeland': 1, 'maximin': 1, 'schulze': 1, 'kemeny': 1}
+    # copeland gives 2 points for each win and 1 point for each tie
+    assert result.scores['copeland'] == [4, 2, 0]
+    assert result.scores['maximin'] == [2, 1, 0]
+    assert vT.kemenyRanking(preferenceProfile, 'max') == [1, 2, 3]
+
+
+
+
+def test_condorcetCycle():
+
+    # 1 beats 2, 2 beats 3 and 3 beats 1, each by 2 agents to 1
+    preferenceProfile = {1: [1, 2, 3], 2: [2, 3, 1], 3: [3, 1, 2]}
+
+    assert vT.condorcet(preferenceProfile, 'max') is False
+    assert vT.evaluate(preferenceProfile, ['condorcet'], 'max').winners == {'condorcet': None}
+
+    # every alternative has the same copeland and maximin score, so the tie break chooses
+    assert vT.copeland(preferenceProfile, 'max') == 3
+    assert vT.maximin(preferenceProfile, 'min') == 1
+    assert vT.schulze(preferenceProfile, 2) == 2
+
+
+
+
+def test_schulzeExample():
+
+    # the example of Schulze's method with 45 voters and 5 candidates A, B, C, D, E (numbered 1 to 5); the ranking is E > A > C > B > D
+    ballotGroups = [(5, 'ACBED'), (5, 'ADECB'), (8, 'BEDAC'), (3, 'CABED'), (7, 'CAEBD'), (2, 'CBADE'), (7, 'DCEBA'), (8, 'EBADC')]
+    rankings = [['ABCDE'.index(candidate) + 1 for candidate in ranking] for noOfVoters, ranking in ballotGroups for _ in range(noOfVoters)]
+    preferenceProfile = {agent: ranking for agent, ranking in enumerate(rankings, start=1)}
+
+    assert vT.condorcet(preferenceProfile, 'max') is False
+    assert vT.schulze(preferenceProfile, 'min') == 5
+    assert [alternative for alternative, _ in vT.socialRanking(preferenceProfile, 'schulze', 'max')] == [5, 1, 3, 2, 4]
+
+
+
+
+def test_kemenyTieBreakAgentOfADictionary():
+
+    # the three rankings are a cycle, so the starting ranking (the preferences of the tie break agent) decides the winner;
+    # the agent is the key of the dictionary, and NOT its position
+    preferenceProfile = {3: [1, 2, 3], 2: [2, 3, 1], 1: [3, 1, 2]}
+
+    vT.clearResultCache()
+
+    for agent, expectedWinner in ((1, 3), (2, 2), (3, 1)):
+        assert vT.kemeny(preferenceProfile, agent) == expectedWinner
+        assert vT.evaluate(preferenceProfile, ['kemeny'], agent).winners == {'kemeny': expectedWinner}
+        assert vT.socialRanking(preferenceProfile, 'kemeny', agent)[0][0] == expectedWinner
+
+    # an agent which is not in the profile is reported, and does not raise an error
+    assert vT.kemeny(preferenceProfile, 99) is False
+    assert vT.evaluate(preferenceProfile, ['kemeny'], 99) is False
+    assert vT.evaluate(preferenceProfile, ['borda', 'kemeny'], 'foo') is False
+
+
+
+
+def test_profileFileRoundTrip(tmp_path):
+
+    valuations = np.random.default_rng(0).integers(0, 4, (200, 5)).astype(np.float64)
+    profile = vT.generatePreferences(valuations, chunkSize=64)
+    path = str(tmp_path / ('votes' + vT.PROFILE_EXTENSION))
+
+    vT.saveProfile(path, profile, valuations)
+    loadedProfile = vT.loadProfile(path)
+
+    assert len(loadedProfile) == len(profile)
+    assert all(list(loadedProfile[agent]) == list(profile[agent]) for agent in profile)
+    assert np.array_equal(loadedProfile.valuationSums, profile.valuationSums)
+    assert np.array_equal(loadedProfile.valuations, valuations)
+    assert loadedProfile.fingerprint() == profile.fingerprint()
+
+    # the arrays are used from the mapped file, and NOT copied
+    assert not loadedProfile.rankings.flags.owndata and not loadedProfile.agentRanking.flags.owndata
+
+    for tieBreakOption in ('max', 'min', 1):
+        assert vT.evaluate(loadedProfile, ['borda', 'STV', 'rangeVoting'], tieBreakOption).winners == vT.evaluate(profile, ['borda', 'STV', 'rangeVoting'], tieBreakOption).winners
+
+    # valuations with a wrong number of rows are not saved, and the file which was saved before is kept
+    with pytest.raises(ValueError):
+        vT.saveProfile(path, profile, valuations[:10])
+
+    assert sorted(file.name for file in tmp_path.iterdir()) == ['votes' + vT.PROFILE_EXTENSION]
+    assert np.array_equal(vT.loadProfile(path).valuations, valuations)
+
+    # a file which is not a profile file is reported
+    otherPath = tmp_path / 'other.vpf'
+    otherPath.write_bytes(b'not a profile file' * 10)
+
+    with pytest.raises(ValueError):
+        vT.loadProfile(str(otherPath))
+
+
+
+
+def test_cachedResultsOfProfilesWithTheSameRankings():
+
+    # the two profiles have the same rankings in a different order of the agents, so their fingerprints are the same
+    firstProfile = {1: [1, 2, 3], 2: [2, 3, 1], 3: [3, 1, 2]}
+    secondProfile = {1: [2, 3, 1], 2: [3, 1, 2], 3: [1, 2, 3]}
+
+    assert vT.asPreferenceProfile(firstProfile).fingerprint() == vT.asPreferenceProfile(secondProfile).fingerprint()
+
+    expectedWinners = {}
+
+    for preferenceProfile in (firstProfile, secondProfile):
+        vT.clearResultCache()
+        expectedWinners[id(preferenceProfile)] = {rule: getattr(vT, rule)(preferenceProfile, 1) for rule in ('plurality', 'borda', 'STV', 'kemeny')}
+
+    # the cycle has no Kemeny winner, so the starting ranking (the preferences of agent 1) decides it
+    assert expectedWinners[id(firstProfile)]['kemeny'] != expectedWinners[id(secondProfile)]['kemeny']
+
+    # the second profile uses the cached results of the first one, which shall not change its winners
+    vT.clearResultCache()
+
+    for preferenceProfile in (firstProfile, secondProfile):
+        assert vT.evaluate(preferenceProfile, ['plurality', 'borda', 'STV', 'kemeny'], 1).winners == expectedWinners[id(preferenceProfile)]
+
+    # a different score vector is a different result
+    assert vT.scoringRule(firstProfile, [1, 0, 0], 'max') == 3
+    assert vT.scoringRule(firstProfile, [2, 1, 0], 'min') == 1
+
+
+
+
+def test_fingerprintAndCacheSize(monkeypatch):
+
+    profile = vT.asPreferenceProfile({1: [1, 2, 3], 2: [2, 1, 3]})
+
+    # another weight of the same rankings, or other rankings, give another fingerprint
+    assert vT.asPreferenceProfile({1: [1, 2, 3], 2: [2, 1, 3], 3: [2, 1, 3]}).fingerprint() != profile.fingerprint()
+    assert vT.asPreferenceProfile({1: [1, 3, 2], 2: [2, 1, 3]}).fingerprint() != profile.fingerprint()
+    assert vT.asPreferenceProfile({2: [2, 1, 3], 1: [1, 2, 3]}).fingerprint() == profile.fingerprint()
+
+    # only the RESULT_CACHE_SIZE most recently used results are kept
+    monkeypatch.setattr(vT, 'RESULT_CACHE_SIZE', 2)
+    vT.clearResultCache()
+
+    for rule in ('plurality', 'borda', 'STV'):
+        vT.ruleScores(profile, rule)
+
+    assert [key[1] for key in vT.resultCache] == ['scoringRule', 'STV']
+
+    monkeypatch.setattr(vT, 'RESULT_CACHE_SIZE', 0)
+    vT.clearResultCache()
+    assert vT.plurality(profile, 'max') == 2 and not vT.resultCache
+
+
+
+
+def test_rangeVotingMatchesSums():
+
+    rows = [(1, 3, 2), (2, 1, 3), (3, 2, 1)]
+    preferenceProfile = referencePreferences(rows)
+
+    # every alternative has the sum 6, so the tie break chooses
+    assert vT.rangeVoting(Sheet(rows), 'max') == 3
+    assert vT.rangeVoting(Sheet(rows), 'min') == 1
+    assert vT.rangeVoting(Sheet(rows), 2) == 3
+    assert vT.rangeVoting(Sheet(rows), 2, preferenceProfile=preferenceProfile) == 3
+    assert vT.rangeVoting(vT.generatePreferences(Sheet(rows)), 1) == 2
+
+    # a profile which does not store the sums cannot be used by range voting
+    assert vT.rangeVoting(vT.asPreferenceProfile(preferenceProfile), 'max') is False
+
+
+
+
+@pytest.mark.parametrize('seed', range(0, NO_OF_RANDOM_PROFILES, 4))
+def test_agentTieBreakMatchesReference(seed):
+
+    rows = randomRows(seed)
+    preferenceProfile = referencePreferences(rows)
+    profile = vT.generatePreferences(Sheet(rows))
+    generator = random.Random(seed)
+    alternatives = list(range(1, len(rows[0]) + 1))
+
+    # the positions of the alternatives are found once per profile, and give the same winner as reading the preferences of the agent
+    for agent in preferenceProfile:
+
+        bestAlternatives = sorted(generator.sample(alternatives, generator.randint(1, len(alternatives))))
+
+        assert vT.tieBreak(agent, bestAlternatives, profile) == referenceTieBreak(agent, bestAlternatives, preferenceProfile)
+        assert vT.tieBreak(agent, bestAlternatives, preferenceProfile) == referenceTieBreak(agent, bestAlternatives, preferenceProfile)
+
+    assert vT.tieBreak(len(rows) + 1, alternatives, profile) is False
+
+
+
+
+@pytest.mark.parametrize('seed', range(0, NO_OF_RANDOM_PROFILES, 4))
+def test_batchScoringRuleMatchesScoringRule(seed):
+
+    rows = randomRows(seed)
+    preferenceProfile = referencePreferences(rows)
+    noOfAlternatives = len(rows[0])
+    generator = random.Random(seed)
+
+    # integer, fractional and unsorted score vectors, which shall all be left as they are
+    scoreVectors = [[generator.randint(0, 3) for _ in range(noOfAlternatives)] for _ in range(5)]
+    scoreVectors.append([Fraction(1, generator.randint(1, 3)) for _ in range(noOfAlternatives)])
+    scoreVectors.append([generator.choice([0.5, 1.5, 0.1]) for _ in range(noOfAlternatives)])
+    givenVectors = [list(scoreVector) for scoreVector in scoreVectors]
+    options = tieBreakOptions(preferenceProfile)
+
+    batchWinners = vT.batchScoringRule(preferenceProfile, givenVectors, options)
+
+    assert batchWinners == [[vT.scoringRule(preferenceProfile, scoreVector, option) for option in options] for scoreVector in scoreVectors]
+    assert givenVectors == scoreVectors
+
+    # one tie break option gives one winner per vector, and a matrix of integer vectors is not modified either
+    scoreMatrix = np.array(scoreVectors[:5])
+    assert vT.batchScoringRule(vT.generatePreferences(Sheet(rows)), scoreMatrix, 'min') == [winners[1] for winners in batchWinners[:5]]
+    assert np.array_equal(scoreMatrix, np.array(scoreVectors[:5]))
+
+
+
+
+def test_batchScoringRuleOfASmallProfile():
+
+    preferenceProfile = {5: [1, 2, 3], 7: [2, 1, 3], 9: [3, 2, 1]}
+
+    # plurality is a three way tie; [2, 1, 0] (borda) gives 1: 3, 2: 4, 3: 2; [1, 1, 0] (veto) gives 1: 2, 2: 3, 3: 1
+    assert vT.batchScoringRule(preferenceProfile, [[1, 0, 0], [0, 1, 2], [1, 0, 1]], 'max') == [3, 2, 2]
+    assert vT.batchScoringRule(preferenceProfile, [[1, 0, 0]], ['min', 7, 9]) == [[1, 2, 3]]
+    assert vT.batchScoringRule(preferenceProfile, [[1, 0]], 'max') is False
+
+
+
+
+def test_metricsRecordTheStagesOfTheRules():
+
+    valuations = np.random.default_rng(1).integers(0, 5, (250, 4))
+    calledStages = []
+    vT.clearResultCache()
+
+    metrics = vT.enableMetrics(vT.Metrics(traceMemory=True, callback=lambda name, stageRecord: calledStages.append(name)))
+
+    try:
+        profile = vT.generatePreferences(valuations, chunkSize=100)
+        vT.evaluate(profile, ['borda', 'veto', 'STV'], 'max')
+        vT.evaluate(profile, ['borda'], 'min')
+
+    finally:
+        assert vT.disableMetrics() is metrics
+
+    report = metrics.report()
+
+    # each rule is recorded under its own name, and NOT as 'scoringRule'; the second borda is taken from the cache
+    assert {'borda', 'veto', 'STV'} <= set(report['stages']) and 'scoringRule' not in report['stages']
+    assert report['stages']['borda']['calls'] == 1
+    assert report['stages']['borda']['peakMemoryBytes'] is not None
+    assert report['counters']['rows'] == 250
+    assert report['counters']['cacheMisses'] == 3 and report['counters']['cacheHits'] == 1
+    assert report['counters']['STVRounds'] >= 1
+    assert set(calledStages) == set(report['stages'])
+
+    # nothing is recorded after the metrics are disabled
+    vT.evaluate(vT.generatePreferences(valuations), ['harmonic'], 'max')
+    assert 'harmonic' not in metrics.report()['stages'] and metrics.report()['counters']['rows'] == 250
+
+
+
+
+def test_multiWinnerSTVTextbookExample():
+
+    # 20 voters choose 3 foods; the Droop quota is 20 // 4 + 1 = 6
+    # 1 Oranges, 2 Pears, 3 Chocolate, 4 Strawberries, 5 Hamburgers
+    ballots = [[1]] * 4 + [[2, 1]] * 2 + [[3, 4]] * 8 + [[3, 5]] * 4 + [[4]] + [[5]]
+
+    # the ballots are completed with the alternatives which are not listed, which are never reached in this count
+    preferenceProfile = {agent: ballot + [alternative for alternative in range(1, 6) if alternative not in ballot] for agent, ballot in enumerate(ballots, start=1)}
+
+    # Chocolate reaches the quota and its surplus of 6 is shared between Strawberries (4) and Hamburgers (2);
+    # Pears is deleted and Oranges reaches the quota; Hamburgers is deleted and Strawberries takes the last seat
+    assert vT.multiWinnerSTV(preferenceProfile, 3, 'max') == [3, 1, 4]
+
+    # with one seat, the quota is 11, so the alternatives are deleted until Chocolate has the majority
+    assert vT.multiWinnerSTV(preferenceProfile, 1, 'max') == [3]
+
+
+
+
+def test_multiWinnerSTVBreaksExactTies():
+
+    # Alternative 1 has all the 6 votes and the quota is 6 // 4 + 1 = 2, so every ballot moves on with 2 / 3 of its value.
+    # Alternative 2 gets three ballots of different rankings, and alternative 3 three ballots of the same ranking: both have exactly 2 votes,
+    # which is the quota. The tie break decides which one is elected first; rounding each transferred value down would give 2 less votes than 3
+    ballots = [[1, 2, 3, 4, 5], [1, 2, 4, 3, 5], [1, 2, 5, 3, 4]] + [[1, 3, 2, 4, 5]] * 3
+    preferenceProfile = {agent: ballot for agent, ballot in enumerate(ballots, start=1)}
+
+    assert vT.multiWinnerSTV(preferenceProfile, 3, 'max') == [1, 3, 2]
+    assert vT.multiWinnerSTV(preferenceProfile, 3, 'min') == [1, 2, 3]
+    assert vT.multiWinnerSTV(preferenceProfile, 3, 4) == [1, 3, 2]
+
+
+
+
+def test_SNTVBlocAndKBorda():
+
+    # first positions: 1 for 3 agents, 2 for 2 agents, 3 for 1 agent, 4 for none
+    preferenceProfile = {1: [1, 4, 2, 3], 2: [1, 4, 3, 2], 3: [1, 2, 4, 3], 4: [2, 4, 1, 3], 5: [2, 3, 4, 1], 6: [3, 4, 2, 1]}
+
+    assert vT.SNTV(preferenceProfile, 2, 'max') == [1, 2]
+    assert vT.SNTV(preferenceProfile, 3, 'max') == [1, 2, 3]
+
+    # in the first two positions: 4 for 4 agents, 1 for 3 agents, 2 for 3 agents, 3 for 2 agents; 1 and 2 are tied
+    assert vT.bloc(preferenceProfile, 2, 'max') == [4, 2]
+    assert vT.bloc(preferenceProfile, 2, 'min') == [4, 1]
+    assert vT.bloc(preferenceProfile, 2, 5) == [4, 2]
+
+    # borda scores: 1, 2 and 4 have 10 points, and 3 has 6 points, so the tie break chooses among 1, 2 and 4
+    assert vT.ruleScores(vT.asPreferenceProfile(preferenceProfile), 'borda') == [10, 10, 6, 10]
+    assert vT.kBorda(preferenceProfile, 2, 'max') == [4, 2]
+    assert vT.kBorda(preferenceProfile, 2, 'min') == [1, 2]
+    assert vT.kBorda(preferenceProfile, 3, 6) == [4, 2, 1]
+    assert vT.kBorda(preferenceProfile, 4, 'min') == [alternative for alternative, _ in vT.socialRanking(preferenceProfile, 'borda', 'min')]
+
+    # the committee size shall be between 1 and the number of alternatives
+    assert vT.SNTV(preferenceProfile, 0, 'max') is False
+    assert vT.bloc(preferenceProfile, 5, 'max') is False
+
+
+
+
+def test_winnerEstimateBound():
+
+    # 2 alternatives and the first check: delta = 0.05 / (2 x 1 x 1 x 2), and the score of a row differs by at most 2 x the range of the scores
+    estimate = vT.winnerEstimate(np.array([60.0, 40.0]), 100, 1, 1.0, 0.95, complete=False)
+
+    assert (estimate.winner, estimate.runnerUp) == (1, 2)
+    assert estimate.margin == pytest.approx(0.2)
+    assert estimate.bound == pytest.approx(2 * np.sqrt(np.log(80) / 200))
+    assert estimate.separated is False
+
+    # the bound of the later checks is larger, because the confidence is divided among all the checks
+    assert vT.winnerEstimate(np.array([60.0, 40.0]), 100, 5, 1.0, 0.95, complete=False).bound > estimate.bound
+    assert vT.winnerEstimate(np.array([60.0, 40.0]), 100, 5, 1.0, 0.95, complete=True).bound == 0.0
+
+
+
+
+def test_estimateWinnerStopsEarlyForAClearLeader(tmp_path):
+
+    # alternative 1 is the first choice of every agent
+    valuations = np.random.default_rng(2).integers(0, 5, (5000, 4)).astype(np.float64)
+    valuations[:, 0] = 10
+
+    estimate = vT.estimateWinner(valuations, 'plurality', chunkSize=100)
+
+    assert estimate.winner == 1 and estimate.separated is True
+    assert estimate.complete is False and estimate.rowsRead < len(valuations)
+    assert estimate.margin > estimate.bound > 0
+
+    # the reading stops at the only chunk, which holds all the rows, so the result is exact; the same for a '.vpf' file
+    estimate = vT.estimateWinner(valuations, 'borda', chunkSize=len(valuations))
+    assert estimate.complete is True and estimate.bound == 0.0 and estimate.rowsRead == len(valuations)
+
+    path = str(tmp_path / ('votes' + vT.PROFILE_EXTENSION))
+    vT.saveProfile(path, vT.generatePreferences(valuations), valuations)
+    estimate = vT.estimateWinner(path, 'rangeVoting', chunkSize=len(valuations))
+    assert estimate.complete is True and estimate.winner == 1
+
+    # a random sample of the rows is read in a different order, and finds the same leader
+    assert vT.estimateWinner(path, 'plurality', chunkSize=100, randomSample=True, seed=1).winner == 1
+
+
+
+
+def test_estimateWinnerOfACloseRace():
+
+    # alternative 1 has one first position more than alternative 2 in 1001 rows, which is not separated before all the rows are read
+    valuations = np.array([[1.0, 0.0], [0.0, 1.0]] * 500 + [[1.0, 0.0]])
+
+    estimate = vT.estimateWinner(valuations, 'plurality', chunkSize=100)
+
+    assert (estimate.winner, estimate.runnerUp) == (1, 2)
+    assert estimate.complete is True and estimate.bound == 0.0 and estimate.rowsRead == 1001
+    assert estimate.margin == pytest.approx(1 / 1001)
+
+    # at most maxRows rows are read; the result is then an estimate
+    estimate = vT.estimateWinner(valuations, 'plurality', chunkSize=100, maxRows=300)
+
+    assert estimate.rowsRead == 300 and estimate.complete is False and estimate.separated is False
+
+
+
+
+def test_estimateWinnerTieBreak():
+
+    # every alternative has the same average, so the tie break chooses the winner
+    valuations = np.array([[1.0, 0.0, 0.5], [0.0, 1.0, 0.5]])
+
+    assert vT.estimateWinner(valuations, 'rangeVoting', 'min').winner == 1
+    assert vT.estimateWinner(valuations, 'rangeVoting', 'max').winner == 3
+
+    # agent 2 prefers 2, then 3; the runner-up is the next alternative of the tie break
+    estimate = vT.estimateWinner(valuations, 'rangeVoting', 2)
+    assert (estimate.winner, estimate.runnerUp, estimate.margin) == (2, 3, 0.0)
+
+    assert vT.estimateWinner(valuations, 'STV') is False
+    assert vT.estimateWinner(valuations, 'scoringRule', scoreVector=[1, 0]) is False
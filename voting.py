@@ -1,492 +1,3052 @@
-
-import  openpyxl as op
-import copy
-
-
-
-
-def generatePreferences(valuationSheet) -> dict:
-
-    '''
-    Input: a worksheet containing a set of numerical values assigned by the agents for the different alternatives
-
-    Output: the preference profile according to the valuation in the worksheet
-
-    The steps followed are:
-    Associate an alternative number for each column starting from 1 and adding 1 for subsequent columns
-    Associate an agent number for each row starting from 1 and adding 1 for subsequent rows 
-    '''
-    
-    preferenceProfile = {}
-    agent = 1
-
-    for row in valuationSheet.iter_rows(min_row = 1, values_only=True):
-        
-        # enumerate each row of the input worksheet to associate a number with each element, corresponding to the alternative number
-        alternatives = list(enumerate(row, start=1))
-
-        # reverse the order of the alternatives; It is done because of the requirement that in case of similar valuation for different 
-        # alternatives, the alternative with larger indices are considered to be more preferred by the agent.
-        # reversing the list results in the list with descending order of alternative numbers
-        alternatives.reverse()
-        
-        # sort the list in decreasing order of valuations for each agent
-        # In case of equal valuations, the higher indices value appears first
-        # i refers to each enumerated alternative
-        # i[0] referes to the index value of each alternative; the index value is assigned in the enumerate function above
-        preference = [i[0] for i in sorted(alternatives, reverse=True, key=lambda x:x[1])]
-        
-        # add new entry in the dictionary, where the keys correspond to the agent number and the values correspond to the ordered list 
-        # of its preferences of alternatives
-        preferenceProfile[agent] = preference
-
-        # before next loop, update the agent number
-        agent += 1
-    
-    #return the dictionary of preference profile
-    return preferenceProfile
-
-
-
-
-def dictatorship(preferenceProfile, agent) -> int:
-
-    '''
-    Input: A dictionary containing preference profile; and, a selected agent number
-
-    Output: the most prefered alternative of the selected agent
-
-    Error handling:
-        Error shall be raised if input is an integer but does not correspond to an agent.
-        Error handling is not included for the cases when the input is not an integer.
-    '''
-
-    if isinstance(agent, int):
-
-        #Implement Error handling only if the input for agent number is an integer
-        try:
-
-            return preferenceProfile[agent][0]
-
-        except KeyError:
-            
-            print("Please enter a valid agent number!!")
-            return "Invalid agent number"
-
-    else:
-
-        #If the input is not an integer, the return will terminate the program with an error
-        return preferenceProfile[agent][0]
-
-
-
-
-def tieBreak(option, bestAlternatives, preferenceProfile = None) -> int:
-
-    '''
-    Input: the preferred option for tie break;
-            a list of the best alternatives among which a winner shall be choosen according to the tie break option;
-            an optional input of the dictionary containg preference profile
-
-    Output: the winner alternative among the list of the best alternatives
-
-    Error handling:
-        Error shall be raised if input is an integer but does not correspond to an agent.
-        Error handling is not included for the cases when the input is not an integer.
-    '''
-    
-    if preferenceProfile != None: 
-        # Enter this section only if the input is a preference profile dictionary
-
-        # Implement Error handling for the cases when the input integer does not correspond to any agent
-        try:
-
-            selectedAlternativePreference = preferenceProfile[option] # This statement will cause a 'KeyError' if the input is not an integer, resulting in execution of 'except' clause
-
-            for alternative in selectedAlternativePreference:
-                
-                #Check the alternatives in the preference of the input agent number
-                if alternative in bestAlternatives:
-                    # The first alternative in the preference order which appear in the list of best alternative, shall be the winning alternative
-                    return alternative
-                
-        except KeyError:
-
-            print("Please enter a valid agent number!!")
-            return False
-        
-    else:
-
-        if option == 'max':
-            return max(bestAlternatives)
-        
-        elif option == 'min':
-            return min(bestAlternatives)
-        
-        else:
-            return "Invalid Tie Break Option!! \nPlease choose 'max' OR 'min' OR an agent number as the tie break option... "
-
-
-
-
-def scoringRule(preferenceProfile, scoreVector, tieBreakOption) -> int:
-
-    '''
-    Input: A dictionary containing preference profile;
-            A scoring rule to be assigned to the alternatives according to the preference order;
-            A tie breaking option
-
-    Output: The alternative with the highest total score;
-            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
-    
-    For each agent, the highest score in the scoring vector is assigned to the most preferred alternative, the second highest to the second most preferred alternative 
-    and so on.
-    Total score of each alternative is calculated by adding scores assigned for each agent's preferences.
-
-    Error Handling is implemented for the cases when the length of score vector list is not equal to the number of alternatives
-    '''
-    
-    #Find the number of alternatives
-    preferences = list(preferenceProfile.values()) #This step makes the program more robust; If later it is decided to introduce name of agents instead of integers, the scoring rule shall still run without modification
-    noOfAlternatives = len(preferences[0]) # Using the length of preference list of first agent. Any agent may be used since all vote for the same number of alternatives
-    
-
-    # Raise an error if the length of the input score vector is not equal to the number of alternatives
-    try:
-
-        if len(scoreVector) != noOfAlternatives:
-            raise Exception("Number of elements in score vector different from number of alternatives")
-        
-    except:
-
-        print("Incorrect input")
-        return False
-
-    # Sort the score vector in decreasing order, because the maximum score shall be assigned to the more prefered alternative and so on for each agent
-    scoreVector.sort(reverse = True)
-
-    # Initialise the total score vector
-    totalScore = [0 for _ in range(noOfAlternatives)]
-
-    # Add the scores assigned to an alternative and repeat for all the agents
-    for preferenceList in preferences:
-
-        i = 0
-        for alternative in preferenceList:
-
-            totalScore[alternative-1] += scoreVector[i] # 'alternative - 1' because the list index start with zero, while alternative numbers start with 1
-            i += 1
-    
-
-    # Initialise the new list, which shall store the alternative number of all the winning alternatives
-    winningAlternatives = []
-
-    # Find the maximum score
-    maxScore = max(totalScore)
-
-    # Find all the alternatives whose score is equal to the maximum score
-    for i in range(len(totalScore)):
-        
-        if maxScore == totalScore[i]:           
-            winningAlternatives.append(i + 1)
-
-    if len(winningAlternatives) == 1:
-        #If there is only one alternative with maximum score, return the winner alternative
-        return winningAlternatives[0]
-    
-    else:
-
-        #If the tie break option is an integer, pass the preference profile dictionary to the tie break function
-        if isinstance(tieBreakOption, int):
-            return tieBreak(tieBreakOption, winningAlternatives, preferenceProfile)
-        
-        #Tie break option must be either 'min' OR 'max' to return a winner alternative, otherwise this will return a warning from the tie break function
-        else:
-            return tieBreak(tieBreakOption, winningAlternatives)
-
-
-
-
-def plurality(preferenceProfile, tieBreakOption) -> int:
-
-    '''
-
-    Input: A dictionary containing preference profile;
-            A tie breaking option
-
-    Output: The alternative which appears most time in the first position of the agents' preference ordering
-            In case more than one alternative is most preferred most frequently, choose the winner according to the tie braking option
-    
-    A frequency list is constructed; the elements correspond to the frequency of alternatives, the list indices correspond to 
-    the alternative number minus 1 (because python list indices start from 0)
-    '''
-    
-    # Find the number of alternatives
-    preferences = list(preferenceProfile.values()) #This step makes the program more robust; If later it is decided to introduce name of agents instead of integers, the scoring rule shall still run without modification
-    noOfAlternatives = len(preferences[0]) # Using the length of preference list of first agent. Any agent may be used since all vote for the same number of alternatives
-
-    # Initialise a list to store frequency of the most preferred alternative
-    alternativeFrequency = [0 for _ in range(noOfAlternatives)]
-    
-    # Find the frequency of most preffered alternative; loop through all the agents in the preference profile dictionary
-    for preference in preferences:
-
-        preferredAlternative = preference[0] # First alternative for each preference
-        alternativeFrequency[preferredAlternative - 1] += 1 # '-1' in index is done to account for list indices starting with 0
-    
-    # Initialise a new list, which shall store the alternative number of all the winning alternatives
-    winningAlternatives = []
-
-    # Find the maximum frequency with which any alternative is most preffered
-    maxFrequency = max(alternativeFrequency)
-
-    # Find all the alternatives whose frequency is equal to the maximum frequency
-    for i in range(len(alternativeFrequency)):
-        
-        if maxFrequency == alternativeFrequency[i]:
-            
-            winningAlternatives.append(i + 1)
- 
-    if len(winningAlternatives) == 1:
-        #If there is only one alternative with maximum score, return the winner alternative
-        return winningAlternatives[0] #index [0] is added to ensure that an integer type is returned and NOT a list type
-    
-    else:
-
-        #If the tie break option is an integer, pass the preference profile dictionary to the tie break function
-        if isinstance(tieBreakOption, int):
-            return tieBreak(tieBreakOption, winningAlternatives, preferenceProfile)
-        
-        #Tie break option must be either 'min' OR 'max' to return a winner alternative, otherwise this will return a warning from the tie break function
-        else:
-            return tieBreak(tieBreakOption, winningAlternatives)
-
-
-
-
-def veto(preferenceProfile, tieBreakOption) -> int:
-
-    '''
-    Input: A dictionary containing preference profile;
-            A tie breaking option
-
-    Output: The alternative with highest total score, where the scores are assigned according to the veto rule;
-            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
-    
-    Scoring rule:
-    For every agent-
-    0 point is assigned to the least prefered alternative
-    1 point to every other alternative
-
-    '''
-
-    # Find the number of alternatives
-    preferences = list(preferenceProfile.values()) #This step makes the program more robust; If later it is decided to introduce name of agents instead of integers, the scoring rule shall still run without modification
-    noOfAlternatives = len(preferences[0]) # Using the length of preference list of first agent. Any agent may be used since all vote for the same number of alternatives
-
-    # Create a scoring rule; initialise a list with length equal to number of alternatives; The list contain all 1's except last element which is 0
-    alternativePoints = [1 for _ in range(noOfAlternatives)]
-    alternativePoints[-1] = 0
-    
-    # Call the scoring rule function and return its value; Pass the preference profile dictionary, scoring rule defined above and the tie break option
-    return scoringRule(preferenceProfile, alternativePoints, tieBreakOption)
-
-
-
-
-def borda(preferenceProfile, tieBreakOption) -> int:
-
-    '''
- 
-    Input: A dictionary containing preference profile;
-            A tie breaking option
-
-    Output: The alternative with highest total score, where the scores are assigned according to the borda rule;
-            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
-    
-    Scoring rule:
-    For every agent, assign a score of -
-        0 to the least preferred alternative
-        1 to the second least preferred alternative
-        2 to the third least preferred
-        and so on.....
-
-    '''
-
-    # Find the number of alternatives
-    preferences = list(preferenceProfile.values()) #This step makes the program more robust; If later it is decided to introduce name of agents instead of integers, the scoring rule shall still run without modification
-    noOfAlternatives = len(preferences[0]) # Using the length of preference list of first agent. Any agent may be used since all vote for the same number of alternatives
-
-    # Create a scoring rule; initialise a list with each element equal to its index
-    # Order of the list is not important here because, for assigning score, the list will be ordered in the scoring rule function
-    alternativePoints = [i for i in range(noOfAlternatives)]
-
-    # Call the scoring rule function and return its value; Pass the preference profile dictionary, scoring rule defined above and the tie break option
-    return scoringRule(preferenceProfile, alternativePoints, tieBreakOption)
-
-
-
-
-def harmonic(preferenceProfile, tieBreakOption) -> int:
-
-    '''
-    Input: A dictionary containing preference profile;
-            A tie breaking option
-
-    Output: The alternative with highest total score, where the scores are assigned according to the harmonic rule;
-            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
-    
-    Scoring rule:
-    For every agent, assign a score of -
-            1/m to the least preferred alternative
-            1/(m-1) to the second least preferred alternative
-            and so on.....
-            such that:
-            1/j is assigned to the jth favourable alternative
-            
-            So,
-            1 should be assigned to the favourite alternative
-            
-    '''
-    # Find the number of alternatives
-    preferences = list(preferenceProfile.values()) #This step makes the program more robust; If later it is decided to introduce name of agents instead of integers, the scoring rule shall still run without modification
-    noOfAlternatives = len(preferences[0]) # Using the length of preference list of first agent. Any agent may be used since all vote for the same number of alternatives
-
-    # Create a scoring rule
-    # Order of the list is not important here because, for assigning score, the list will be ordered in the scoring rule function
-    alternativeScores = [1/(i+1) for i in range(noOfAlternatives)]
-    
-    # Call the scoring rule function and return its value; Pass the preference profile dictionary, scoring rule defined above and the tie break option
-    return scoringRule(preferenceProfile, alternativeScores, tieBreakOption)
-
-
-
-
-def STV(preferenceProfile, tieBreakOption) -> int:
-
-    '''
-    Input: A dictionary containing preference profile;
-            A tie breaking option
-
-    Output: 
-            The alternative which satisfies the STV voting rule;
-            In case of multiple such alternatives, choose the winner according to the tie braking option
-    
-    The winner is selected in rounds:
-        In each round, the alternative appearing least frequently in first position of agents is removed
-        A frequency list shall be made for first position of agents' alternatives
-        The alternative corresponding to least frequency is identified 
-        There may be more than one alternative for the least frequency
-        All such alternative shall be identified and shall be deleted for subsequent operations
-        
-        These deleted alternatives shall be stored in another list
-        The alternatives deleted last shall participate in tie breaker, which shall resolve a winner alternative
-        If only one alternative is deleted last, it is the winner alternative
-
-    '''
-
-    # Copy the Preference Profile dictionary, the copied dictionary shall be modified by deleting the least frequent most preffered alternative
-    #  because it need to be passed for tie break
-    updatedProfile = copy.deepcopy(preferenceProfile) # All the methods to copy other than deepcopy, resulted in a shallow copy
-
-    agents = list(updatedProfile.keys()) # Used later in the function to loop through all the agents
-
-    # The following loop removes the least frequent most preffered alternative from the updated preference profile
-    while updatedProfile[agents[0]]: # Run the loop untill the list of preferences does not empty
-                                     # agent[0] is used to ensure robustness of the program- In case agents are identified by something
-                                     # other than integers, this function shall still work
-        
-        # Initialise a dictionary which contains alternatives as keys and values as their frequency as most preffered option
-        # The keys are all the alternatives currently available in the updated preference profile
-        alternativeFrequency = {k:0 for k in list(updatedProfile.values())[0]}
-
-        # Count frequency of all the most preferred alternatives
-        for agent in agents:
-            preferredAlternative = updatedProfile[agent][0] # index 0 referes to the most prefered alternative
-            alternativeFrequency[preferredAlternative] += 1 # increase the frequency of the most prefered alternative by 1
-        
-        # Find the minimum frequency of all the available alternative as most preferred option by agents
-        minimumFrequency = min(alternativeFrequency.values())
-
-        # Initialise a list to store all the alternatives which appear with the minimum frequency
-        leastFrequentAlternatives = []
-        
-        # Find all the alternatives which appear least frequently as the most preffered option
-        for i in alternativeFrequency.keys():
-            if alternativeFrequency[i] == minimumFrequency:
-                leastFrequentAlternatives.append(i)
-        
-        # Update the preference profile by removing all the least frequent most preffered alternative
-        for leastFrequent in leastFrequentAlternatives:
-
-            #Loop through all the agents
-            for agent in agents:
-                updatedProfile[agent].remove(leastFrequent)
-    
-
-    if len(leastFrequentAlternatives) == 1:
-
-        #If there is only one alternative with maximum score, return the winner alternative
-        return leastFrequentAlternatives[0] #index [0] is added to ensure that an integer type is returned and NOT a list type
-    
-    else:
-
-        #If the tie break option is an integer, pass the preference profile dictionary to the tie break function
-        if isinstance(tieBreakOption, int):
-            return tieBreak(tieBreakOption, leastFrequentAlternatives, preferenceProfile)
-        
-        #Tie break option must be either 'min' OR 'max' to return a winner alternative, otherwise this will return a warning from the tie break function
-        else:
-            return tieBreak(tieBreakOption, leastFrequentAlternatives)
-
-
-
-
-def rangeVoting(valuationSheet, tieBreakOption) -> int:
-
-    '''
-    Input: A worksheet (xlsx file) containing valuation for the alternatives by the agents;
-            A tie breaking option
-    Output: 
-            The alternative which satisfies the range voting rule;
-            In case of multiple such alternatives, choose the winner according to the tie braking option
-    
-    The winner is the alternative with maximum sum of valuations
-    '''
-
-    # Initialise the list to store the sum of valuations for each alternative
-    alternativeValueSum = []
-
-    # Calculate the sum of valuations for each alternative assigned by each agent
-    for valuation in valuationSheet.iter_cols(min_col=1, values_only=True):
-        alternativeValueSum.append(sum(valuation))
-    
-    # Find the maximum sum
-    maxPoints = max(alternativeValueSum)
-
-    # Initialise a list to store all the alternatives with maximum total valuation
-    winningAlternatives = []
-
-    # Add the alternatives with maximum valuation in the new list
-    for i in range(len(alternativeValueSum)):
-        
-        if maxPoints == alternativeValueSum[i]:           
-            winningAlternatives.append(i + 1)
-    
-
-    if len(winningAlternatives) == 1:
-
-        #If there is only one alternative with maximum score, return the winner alternative
-        return winningAlternatives[0] #index [0] is added to ensure that an integer type is returned and NOT a list type
-    else:
-
-        #If the tie break option is an integer, pass the preference profile dictionary to the tie break function
-        if isinstance(tieBreakOption, int):
-
-            # A new dictionary is generated for preference profile because tie break function need dictionary as an input
-            preferenceProfile = generatePreferences(valuationSheet)
-            return tieBreak(tieBreakOption, winningAlternatives, preferenceProfile)
-        
-        else:
-            #Tie break option must be either 'min' OR 'max' to return a winner alternative, otherwise this will return a warning from the tie break function
-            return tieBreak(tieBreakOption, winningAlternatives)
\ No newline at end of file
+
+import  openpyxl as op
+import numpy as np
+import csv
+import hashlib
+import mmap
+import os
+import struct
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from fractions import Fraction
+from math import gcd, lcm, log, sqrt
+from itertools import islice
+from typing import Optional
+import heapq
+
+
+# Number of rows read from an input file at a time; only one chunk of rows is kept in the memory while counting
+CHUNK_SIZE = 10000
+
+# Binary profile files, see 'saveProfile': the first bytes of the file, the version of the format, and the layout of the header
+PROFILE_EXTENSION = '.vpf'
+PROFILE_MAGIC = b'VOTEPRF\x00'
+PROFILE_VERSION = 1
+PROFILE_HEADER = struct.Struct('<8sIIIIIIQQ') # magic, version, flags, alternatives, bytes per ranking element, bytes per agent ranking number, unused, rankings, agents
+PROFILE_HAS_SUMS = 1
+PROFILE_HAS_VALUATIONS = 2
+
+# Number of rule results kept by 'cachedRuleResult'; the least recently used result is removed first, and 0 turns the cache off
+RESULT_CACHE_SIZE = 256
+
+# The Metrics object which records the stages of the program, see 'enableMetrics'; nothing is recorded while it is None
+metrics = None
+NO_STAGE = nullcontext()
+
+
+
+
+class Metrics:
+
+    '''
+    Records where the time (and optionally the memory) of a run goes
+
+        stages: for each stage, e.g. 'ingest', 'ranking', 'positionCounts' or the name of a voting rule, the total seconds,
+                the number of times the stage ran, and the largest memory allocated by the stage above the memory at its start
+                (only if the memory is traced, otherwise None)
+        counters: numbers counted during the run, e.g. 'rows' read from the input, 'STVRounds', 'cacheHits' and 'cacheMisses'
+
+    The object is used only after 'enableMetrics'; while no Metrics object is enabled, each instrumented place of this file only checks
+    that the module variable 'metrics' is None, so the program is not slowed down.
+    A callback may be given, which is called with the name of a stage and its record each time the stage ends, e.g. to log slow stages.
+    The processes started by 'workers' have their own module variables, so their stages are not recorded.
+    '''
+
+    def __init__(self, traceMemory=False, callback=None):
+
+        self.traceMemory = traceMemory
+        self.callback = callback
+        self.stages = {}
+        self.counters = {}
+        self.startedTracing = False
+
+        # the memory at the start and the peak memory so far of each stage which is running, the innermost stage last
+        self._runningStages = []
+
+    @contextmanager
+    def stage(self, name):
+
+        '''
+        Records the time of the code in the 'with' block as the stage 'name'
+        '''
+
+        tracing = self.traceMemory and tracemalloc.is_tracing()
+
+        if tracing:
+            # the peak is reset for the new stage, so the peak so far is kept for the stages which are running
+            self._updatePeaks()
+            tracemalloc.reset_peak()
+            self._runningStages.append([tracemalloc.get_traced_memory()[0], 0])
+
+        start = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+
+            seconds = time.perf_counter() - start
+            peakMemory = None
+
+            if tracing:
+                self._updatePeaks()
+                startMemory, peak = self._runningStages.pop()
+                peakMemory = max(peak - startMemory, 0)
+
+            self.record(name, seconds, peakMemory)
+
+    def _updatePeaks(self):
+
+        peak = tracemalloc.get_traced_memory()[1]
+
+        for runningStage in self._runningStages:
+            runningStage[1] = max(runningStage[1], peak)
+
+    def record(self, name, seconds, peakMemory=None):
+
+        '''
+        Adds the seconds (and the peak memory, if it is known) of one run of the stage 'name'
+        '''
+
+        stageRecord = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'peakMemoryBytes': None})
+        stageRecord['seconds'] += seconds
+        stageRecord['calls'] += 1
+
+        if peakMemory is not None:
+            stageRecord['peakMemoryBytes'] = max(stageRecord['peakMemoryBytes'] or 0, peakMemory)
+
+        if self.callback is not None:
+            self.callback(name, stageRecord)
+
+    def count(self, name, amount=1):
+
+        '''
+        Adds the amount to the counter 'name'
+        '''
+
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self) -> dict:
+
+        '''
+        Output: a dictionary with a copy of the stages and the counters
+        '''
+
+        return {'stages': {name: dict(stageRecord) for name, stageRecord in self.stages.items()}, 'counters': dict(self.counters)}
+
+
+
+
+def enableMetrics(newMetrics=None, traceMemory=False) -> Metrics:
+
+    '''
+    Input: optionally, a Metrics object (e.g. with a callback); a new one is made if it is not given;
+            True if the memory of the stages shall be traced with tracemalloc, which slows down the program
+
+    Output: the Metrics object which records the stages from now on, untill 'disableMetrics' is called
+    '''
+
+    global metrics
+
+    metrics = newMetrics if newMetrics is not None else Metrics(traceMemory)
+
+    if metrics.traceMemory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        metrics.startedTracing = True
+
+    return metrics
+
+
+
+
+def disableMetrics() -> Metrics:
+
+    '''
+    Output: the Metrics object which was enabled (None if there was none); nothing is recorded after this call
+    '''
+
+    global metrics
+
+    disabledMetrics, metrics = metrics, None
+
+    if disabledMetrics is not None and disabledMetrics.startedTracing:
+        tracemalloc.stop()
+        disabledMetrics.startedTracing = False
+
+    return disabledMetrics
+
+
+
+
+def metricsStage(name):
+
+    '''
+    Output: a context manager recording the stage 'name' in the enabled Metrics object; it does nothing if no Metrics object is enabled
+    '''
+
+    return NO_STAGE if metrics is None else metrics.stage(name)
+
+
+
+
+class PreferenceProfile(Mapping):
+
+    '''
+    A compact, weighted preference profile
+
+    Usually there are far fewer different rankings than agents, so every different ranking is stored only once:
+        rankings: a matrix with one row per different ranking; a row holds the alternatives in decreasing order of preference
+        weights: the number of agents which have each ranking
+        agentRanking: the row of 'rankings' which holds the preferences of each agent; index (agent - 1) corresponds to the agent
+    The rules count each ranking once and multiply by its weight, so the work does not depend on the number of agents.
+
+    The class behaves like the dictionary used in the earlier versions of this file: profile[agent] returns the preference list of the agent,
+    so dictatorship, tieBreak and any code written for the dictionary keep working.
+
+    The number of times each alternative appears at each position is counted once and reused by all the scoring rules.
+    If the profile is generated from the valuations, the sum of the valuations of each alternative is stored as well, which is used by range voting.
+    '''
+
+    def __init__(self, rankings, weights=None, agentRanking=None, valuationSums=None):
+
+        '''
+        Input: a matrix of rankings, one row per ranking;
+                the number of agents with each ranking; every ranking belongs to one agent if the weights are not given;
+                the row of each agent; if it is not given, the agents are numbered in the order of the rankings
+                (the agents with the first ranking first, then the agents with the second ranking and so on)
+                the sums of the valuations of the alternatives, if they are known
+        '''
+
+        self.rankings = rankings
+        self.weights = np.ones(len(rankings), dtype=np.int64) if weights is None else weights
+        self.agentRanking = np.repeat(np.arange(len(rankings)), self.weights) if agentRanking is None else agentRanking
+        self.valuationSums = valuationSums
+        self._positionCounts = None
+        self._rankPositions = None
+        self._pairwiseMatrix = None
+        self._fingerprint = None
+
+    def __getitem__(self, agent):
+
+        # Agents are numbered from 1, the same as the keys of the dictionary profile; any other key is not an agent
+        if isinstance(agent, (int, np.integer)) and 1 <= agent <= len(self.agentRanking):
+            return self.rankings[self.agentRanking[agent - 1]].tolist() # tolist() returns python integers and NOT numpy integers
+
+        raise KeyError(agent)
+
+    def __iter__(self):
+        return iter(range(1, len(self.agentRanking) + 1))
+
+    def __len__(self):
+        return len(self.agentRanking)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    @property
+    def noOfAlternatives(self) -> int:
+        return self.rankings.shape[1]
+
+    @property
+    def rankMatrix(self):
+
+        '''
+        The agents x alternatives matrix of the preferences of all the agents; it is made from the rankings every time it is used
+        '''
+
+        return self.rankings[self.agentRanking]
+
+    def rankingCounts(self) -> dict:
+
+        '''
+        Output: a dictionary with each different ranking (a tuple of alternatives) as key and the number of agents with the ranking as value
+        '''
+
+        return {tuple(ranking): weight for ranking, weight in zip(self.rankings.tolist(), self.weights.tolist())}
+
+    def positionCounts(self):
+
+        '''
+        Output: a matrix of shape alternatives x positions;
+                element [a - 1, p] is the number of agents which have alternative a at position p of their preference order
+
+        The matrix is calculated on the first call and stored for all the subsequent calls
+        '''
+
+        if self._positionCounts is None:
+
+            with metricsStage('positionCounts'):
+
+                noOfAlternatives = self.noOfAlternatives
+                positionCounts = np.zeros((noOfAlternatives, noOfAlternatives), dtype=np.int64)
+
+                # One bincount per position, each ranking is counted as many times as its weight;
+                # index 0 of the bincount is never used because alternative numbers start with 1
+                for position in range(noOfAlternatives):
+                    positionCounts[:, position] = np.bincount(self.rankings[:, position], weights=self.weights, minlength=noOfAlternatives + 1)[1:]
+
+                self._positionCounts = positionCounts
+
+        return self._positionCounts
+
+    def firstChoiceCounts(self):
+
+        '''
+        Output: an array with the number of agents which prefer each alternative the most; index (a - 1) corresponds to alternative a
+        '''
+
+        # The first choices are the first column of the position counts;
+        # If the position counts are not calculated yet, only the first position of the rankings is counted
+        if self._positionCounts is not None:
+            return self._positionCounts[:, 0]
+
+        firstChoices = np.bincount(self.rankings[:, 0], weights=self.weights, minlength=self.noOfAlternatives + 1)[1:] # '[1:]' because alternative numbers start with 1
+
+        return firstChoices.astype(np.int64)
+
+    def rankPositions(self):
+
+        '''
+        Output: a matrix with one row per ranking; element [r, a - 1] is the position of alternative a in ranking r (0 for the most preferred)
+
+        The matrix is calculated on the first call and stored for all the subsequent calls
+        '''
+
+        if self._rankPositions is None:
+            # Each ranking contains every alternative once, so sorting the alternatives of a ranking gives the position of each alternative
+            self._rankPositions = np.argsort(self.rankings, axis=1).astype(rankDtype(self.noOfAlternatives))
+
+        return self._rankPositions
+
+    def agentPositions(self, agent):
+
+        '''
+        Input: an agent number
+
+        Output: an array with the position of each alternative in the preferences of the agent (0 for the most preferred);
+                index (a - 1) corresponds to alternative a
+
+        The positions are a row of 'rankPositions', which is calculated once for all the agents; a KeyError is raised for an invalid agent number
+        '''
+
+        if isinstance(agent, (int, np.integer)) and 1 <= agent <= len(self.agentRanking):
+            return self.rankPositions()[self.agentRanking[agent - 1]]
+
+        raise KeyError(agent)
+
+    def preferredAlternative(self, agent, alternatives) -> int:
+
+        '''
+        Input: an agent number; a list of alternatives
+
+        Output: the alternative of the list which the agent prefers the most
+
+        Only the positions of the alternatives of the list are compared, so the work does not depend on the number of alternatives of the profile
+        '''
+
+        alternatives = np.asarray(alternatives, dtype=np.intp)
+        positions = self.agentPositions(agent)
+
+        return int(alternatives[np.argmin(positions[alternatives - 1])])
+
+    def pairwiseMatrix(self):
+
+        '''
+        Output: a matrix of shape alternatives x alternatives;
+                element [a - 1, b - 1] is the number of agents which prefer alternative a to alternative b
+
+        The matrix is calculated from the positions of the alternatives in each ranking, weighted by the number of agents with the ranking;
+        it is calculated on the first call and stored for all the subsequent calls, so all the pairwise rules use the same matrix
+        '''
+
+        if self._pairwiseMatrix is None:
+
+            with metricsStage('pairwiseMatrix'):
+
+                rankPositions = self.rankPositions()
+                noOfAlternatives = self.noOfAlternatives
+                pairwiseMatrix = np.zeros((noOfAlternatives, noOfAlternatives), dtype=np.int64)
+
+                # The rankings are taken in blocks, so that the temporary comparison matrices stay small;
+                # one row of the matrix at a time: the agents which place alternative a before each other alternative
+                for firstRanking in range(0, len(rankPositions), CHUNK_SIZE):
+
+                    blockPositions = rankPositions[firstRanking:firstRanking + CHUNK_SIZE]
+                    blockWeights = self.weights[firstRanking:firstRanking + CHUNK_SIZE]
+
+                    for alternative in range(noOfAlternatives):
+                        pairwiseMatrix[alternative] += blockWeights @ (blockPositions[:, [alternative]] < blockPositions)
+
+                self._pairwiseMatrix = pairwiseMatrix
+
+        return self._pairwiseMatrix
+
+    def fingerprint(self) -> bytes:
+
+        '''
+        Output: a hash of the rankings, their weights and the sums of the valuations, i.e. of everything the scores of the rules depend on
+
+        Two profiles with the same fingerprint have the same scores for every rule, so 'cachedRuleResult' uses it as the key of the profile.
+        The order of the agents is not part of the fingerprint, because it is used only by the tie break
+        (the starting ranking of 'kemeny' is keyed by the preferences of the tie break agent, see 'cachedRuleResult').
+        The hash is calculated on the first call and stored, so the arrays of a profile shall not be modified after it is used.
+
+        The bytes of the arrays are hashed as they are stored, together with their type and shape, so the arrays are NOT copied
+        (e.g. the rankings mapped from a binary profile file stay in the file); the same rankings stored with another integer type
+        give another fingerprint, which only means that their results are calculated again.
+        '''
+
+        if self._fingerprint is None:
+
+            profileHash = hashlib.blake2b(digest_size=16)
+
+            for array in (self.rankings, self.weights):
+                profileHash.update(f'{array.dtype.str}{array.shape}'.encode())
+                profileHash.update(memoryview(np.ascontiguousarray(array)))
+
+            if self.valuationSums is not None:
+                profileHash.update(repr(np.asarray(self.valuationSums).tolist()).encode())
+
+            self._fingerprint = profileHash.digest()
+
+        return self._fingerprint
+
+
+
+
+class RankingIndex:
+
+    '''
+    Collects the different rankings of a profile while its agents are added, one chunk of agents at a time
+
+    Each different ranking gets a number (a row of the rankings of the profile) the first time it is added;
+    after that, only its weight is increased.
+    '''
+
+    def __init__(self):
+
+        self.rankingNumbers = {} # the key is the bytes of a ranking
+        self.rankings = []
+        self.weights = []
+
+    def add(self, rankChunk, chunkWeights=None):
+
+        '''
+        Input: a matrix of rankings, one row per agent (or per group of agents);
+                optionally, the number of agents with each row; 1 if it is not given
+
+        Output: an array with the number of the ranking of each row
+        '''
+
+        rankChunk = np.ascontiguousarray(rankChunk)
+        noOfRows, rowBytes = len(rankChunk), rankChunk.shape[1] * rankChunk.itemsize
+
+        # Each row is turned into a single key, so that the rows are compared as one value and NOT alternative by alternative:
+        # a row of at most 8 bytes is packed in an unsigned 64-bit integer, a longer row is compared as raw bytes
+        if rowBytes <= 8:
+            packedRows = np.zeros((noOfRows, 8), dtype=np.uint8)
+            packedRows[:, :rowBytes] = rankChunk.view(np.uint8).reshape(noOfRows, rowBytes)
+            rowKeys = packedRows.view(np.uint64).reshape(-1)
+        else:
+            rowKeys = rankChunk.view(np.dtype((np.void, rowBytes))).reshape(-1)
+
+        _, firstRows, inverse, counts = np.unique(rowKeys, return_index=True, return_inverse=True, return_counts=True)
+        chunkRankings = rankChunk[firstRows]
+        inverse = inverse.reshape(-1)
+
+        if chunkWeights is not None:
+            counts = np.bincount(inverse, weights=chunkWeights, minlength=len(chunkRankings)).astype(np.int64)
+
+        rankingNumbers = np.empty(len(chunkRankings), dtype=np.int64)
+
+        for i, ranking in enumerate(chunkRankings):
+
+            key = ranking.tobytes()
+            rankingNumber = self.rankingNumbers.get(key)
+
+            if rankingNumber is None:
+                # A new ranking
+                rankingNumber = len(self.rankings)
+                self.rankingNumbers[key] = rankingNumber
+                self.rankings.append(ranking)
+                self.weights.append(0)
+
+            self.weights[rankingNumber] += int(counts[i])
+            rankingNumbers[i] = rankingNumber
+
+        return rankingNumbers[inverse]
+
+    def profile(self, agentRanking, valuationSums=None) -> PreferenceProfile:
+
+        '''
+        Input: the number of the ranking of each agent, i.e. the outputs of 'add' in the order of the agents; the sums of the valuations, if known
+
+        Output: the PreferenceProfile of the agents
+        '''
+
+        if not self.rankings:
+            # A profile without agents
+            return PreferenceProfile(np.zeros((0, 0), dtype=np.uint8))
+
+        # The number of the ranking of each agent is stored with 4 bytes, unless there are more than 2^32 - 1 different rankings
+        agentRanking = agentRanking.astype(np.uint32 if len(self.rankings) <= np.iinfo(np.uint32).max else np.int64)
+
+        return PreferenceProfile(np.array(self.rankings), np.array(self.weights, dtype=np.int64), agentRanking, valuationSums)
+
+
+
+
+def rankDtype(noOfAlternatives):
+
+    '''
+    Output: the smallest unsigned integer type which can store the alternative numbers 1 to noOfAlternatives
+    '''
+
+    if noOfAlternatives <= np.iinfo(np.uint8).max:
+        return np.uint8
+
+    elif noOfAlternatives <= np.iinfo(np.uint16).max:
+        return np.uint16
+
+    return np.uint32
+
+
+
+
+def asPreferenceProfile(preferenceProfile) -> PreferenceProfile:
+
+    '''
+    Input: a PreferenceProfile or a dictionary containing preference profile
+
+    Output: a PreferenceProfile; the input is returned unchanged if it is already a PreferenceProfile
+    '''
+
+    if isinstance(preferenceProfile, PreferenceProfile):
+        return preferenceProfile
+
+    preferences = list(preferenceProfile.values())
+
+    if not preferences:
+        return PreferenceProfile(np.zeros((0, 0), dtype=np.uint8))
+
+    return profileFromRankMatrix(np.array(preferences, dtype=rankDtype(len(preferences[0]))))
+
+
+
+
+def profileFromRankingCounts(rankingCounts) -> PreferenceProfile:
+
+    '''
+    Input: a dictionary with rankings (tuples of alternatives in decreasing order of preference) as keys and the number of agents with each ranking as values,
+            e.g. the output of 'PreferenceProfile.rankingCounts'
+
+    Output: the PreferenceProfile of the agents; the agents are numbered in the order of the rankings in the dictionary
+    '''
+
+    rankings = list(rankingCounts.keys())
+
+    if not rankings:
+        return PreferenceProfile(np.zeros((0, 0), dtype=np.uint8))
+
+    return PreferenceProfile(np.array(rankings, dtype=rankDtype(len(rankings[0]))), np.array(list(rankingCounts.values()), dtype=np.int64))
+
+
+
+
+def profileFromRankMatrix(rankMatrix, valuationSums=None) -> PreferenceProfile:
+
+    '''
+    Input: an agents x alternatives matrix, the row (agent - 1) holds the alternatives of the agent in decreasing order of preference;
+            the sums of the valuations, if known
+
+    Output: the PreferenceProfile of the agents, where each different ranking is stored only once
+    '''
+
+    rankingIndex = RankingIndex()
+
+    return rankingIndex.profile(rankingIndex.add(rankMatrix), valuationSums)
+
+
+
+
+def numberOfAlternatives(preferenceProfile) -> int:
+
+    '''
+    Output: the number of alternatives in a PreferenceProfile or a dictionary containing preference profile
+    '''
+
+    if isinstance(preferenceProfile, PreferenceProfile):
+        return preferenceProfile.noOfAlternatives
+
+    # Using the length of preference list of first agent. Any agent may be used since all vote for the same number of alternatives
+    return len(next(iter(preferenceProfile.values())))
+
+
+
+
+def winnerFromScores(totalScore, tieBreakOption, preferenceProfile) -> int:
+
+    '''
+    Input: a list of total scores, where the list index corresponds to the alternative number minus 1;
+            A tie breaking option;
+            The preference profile, used if the tie break option is an agent number
+
+    Output: The alternative with the highest total score;
+            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
+    '''
+
+    return winnerFromTies(tiedAlternatives(totalScore), tieBreakOption, preferenceProfile)
+
+
+
+
+def tiedAlternatives(totalScore) -> list:
+
+    '''
+    Input: a list of total scores, where the list index corresponds to the alternative number minus 1
+
+    Output: the list of the alternatives with the highest total score
+    '''
+
+    # Find the maximum score
+    maxScore = max(totalScore)
+
+    # Find all the alternatives whose score is equal to the maximum score
+    return [i + 1 for i in range(len(totalScore)) if totalScore[i] == maxScore]
+
+
+
+
+def winnerFromTies(winningAlternatives, tieBreakOption, preferenceProfile) -> int:
+
+    '''
+    Input: the list of the alternatives with the highest total score;
+            A tie breaking option;
+            The preference profile, used if the tie break option is an agent number
+
+    Output: the only alternative of the list, or the alternative chosen by the tie break
+    '''
+
+    if len(winningAlternatives) == 1:
+        #If there is only one alternative with maximum score, return the winner alternative
+        return winningAlternatives[0]
+
+    #If the tie break option is an integer, pass the preference profile dictionary to the tie break function
+    if isinstance(tieBreakOption, int):
+        return tieBreak(tieBreakOption, list(winningAlternatives), preferenceProfile)
+
+    #Tie break option must be either 'min' OR 'max' to return a winner alternative, otherwise this will return a warning from the tie break function
+    return tieBreak(tieBreakOption, list(winningAlternatives))
+
+
+
+
+def csvRows(path, shardIndex=0, noOfShards=1):
+
+    '''
+    Input: the path of a 'csv' file containing valuations, one row per agent and one column per alternative;
+            optionally, the number of the shard to read (starting from 0) and the total number of shards
+
+    Output: yields the rows of the file one at a time, as tuples of numbers; a blank cell is returned as None, the same as openpyxl does
+
+    If the file is divided in shards, each shard is a range of bytes of the file of nearly the same size;
+    a row belongs to the shard which contains its first character, so every row is read by exactly one shard
+    '''
+
+    with open(path, 'rb') as csvFile:
+
+        fileSize = os.fstat(csvFile.fileno()).st_size
+        shardStart = fileSize * shardIndex // noOfShards
+        shardEnd = fileSize * (shardIndex + 1) // noOfShards
+
+        if shardStart:
+            # Skip the rest of the row which started in the previous shard
+            csvFile.seek(shardStart - 1)
+            csvFile.readline()
+
+        # A file saved by excel as 'CSV UTF-8' starts with a byte order mark, which 'utf-8-sig' removes from the first line;
+        # the mark is not found in the other lines, so they are decoded as plain 'utf-8'
+        def shardLines():
+            while csvFile.tell() < shardEnd:
+                yield csvFile.readline().decode('utf-8-sig')
+
+        for record in csv.reader(shardLines()):
+
+            # Skip the empty lines, which are usually found at the end of the file
+            if record:
+                yield tuple(float(value) if value.strip() else None for value in record)
+
+
+
+
+def shardableSource(valuationSource) -> bool:
+
+    '''
+    Output: True if the valuations can be read in shards by several processes, i.e. if the source is the path of a 'csv' file
+
+    Each shard of a 'csv' file starts reading at its own byte offset (see 'csvRows'). An 'xlsx' file is compressed xml, which cannot be read
+    from the middle: every process would parse all the rows before its shard, so reading the file in shards is slower than reading it
+    in one process. An 'xlsx' file is therefore always read by one process, whatever the number of workers.
+    '''
+
+    return isinstance(valuationSource, (str, os.PathLike)) and os.fspath(valuationSource).lower().endswith('.csv')
+
+
+
+
+def valuationChunks(valuationSource, chunkSize=CHUNK_SIZE, shardIndex=0, noOfShards=1):
+
+    '''
+    Input: a worksheet, OR the path of an 'xlsx' or 'csv' file, OR a numpy matrix, containing the valuations assigned by the agents for the different alternatives;
+            the maximum number of rows in a chunk;
+            optionally, the number of the shard to read (starting from 0) and the total number of shards, if the file is read by several processes
+
+    Output: yields the rows of the valuations in chunks; each chunk is a list of at most chunkSize rows, and each row is a tuple of valuations
+
+    An 'xlsx' file is opened in the read-only mode of openpyxl, which parses the rows of the file as they are needed instead of
+    loading all the cells of the worksheet in the memory. Only one chunk of rows is kept in the memory at a time.
+    A numpy matrix of valuations (one row per agent) may be used as well, e.g. for generated valuations; its chunks are views of the matrix.
+    The valuations saved in a binary profile file ('.vpf', see 'saveProfile') are read from the memory-mapped file in the same way.
+
+    The shards of a 'csv' file are explained in 'csvRows'; the shards of a numpy matrix are ranges of rows of nearly the same size.
+    An 'xlsx' file (or a worksheet) cannot be divided in shards, because each shard would parse all the rows before it (see 'shardableSource'),
+    so a ValueError is raised if it is asked for more than one shard.
+    '''
+
+    if isinstance(valuationSource, (str, os.PathLike)) and os.fspath(valuationSource).lower().endswith(PROFILE_EXTENSION):
+
+        valuations = loadProfile(valuationSource).valuations
+
+        if valuations is None:
+            raise ValueError(f"'{os.fspath(valuationSource)}' does not contain the valuations of the agents")
+
+        valuationSource = valuations
+
+    if isinstance(valuationSource, np.ndarray):
+
+        valuationSource = valuationSource[len(valuationSource) * shardIndex // noOfShards:len(valuationSource) * (shardIndex + 1) // noOfShards]
+
+        for firstRow in range(0, len(valuationSource), chunkSize):
+
+            if metrics is not None:
+                metrics.count('rows', len(valuationSource[firstRow:firstRow + chunkSize]))
+
+            yield valuationSource[firstRow:firstRow + chunkSize]
+
+        return
+
+    if noOfShards > 1 and not shardableSource(valuationSource):
+        raise ValueError("Only a 'csv' file or a numpy matrix of valuations can be read in shards; an 'xlsx' file is read by one process")
+
+    # The time of opening the file and reading each chunk is recorded as the stage 'ingest', if the metrics are enabled
+    start = time.perf_counter()
+    workbook = None
+
+    if isinstance(valuationSource, (str, os.PathLike)):
+
+        if os.fspath(valuationSource).lower().endswith('.csv'):
+            rows = csvRows(valuationSource, shardIndex, noOfShards)
+
+        else:
+            workbook = op.load_workbook(valuationSource, read_only=True, data_only=True)
+            rows = workbook.active.iter_rows(min_row = 1, values_only=True)
+
+    else:
+        # Otherwise the input is a worksheet, which is already loaded
+        rows = valuationSource.iter_rows(min_row = 1, values_only=True)
+
+    try:
+
+        chunk = list(islice(rows, chunkSize))
+
+        while chunk:
+
+            if metrics is not None:
+                metrics.record('ingest', time.perf_counter() - start)
+                metrics.count('rows', len(chunk))
+
+            yield chunk
+
+            start = time.perf_counter()
+            chunk = list(islice(rows, chunkSize))
+
+    finally:
+
+        # A workbook opened in read-only mode keeps the file open untill it is closed
+        if workbook is not None:
+            workbook.close()
+
+
+
+
+def rankScores(totalScore, tieBreakOption, preferenceProfile=None, k=None) -> list:
+
+    '''
+    Input: a list of total scores, where the list index corresponds to the alternative number minus 1;
+            A tie breaking option, used to order the alternatives with the same score;
+            The preference profile, used if the tie break option is an agent number;
+            optionally, the number k of the best alternatives to return
+
+    Output: a list of (alternative, score) pairs in decreasing order of score;
+            alternatives with the same score are in the order given by the tie break, so the first alternative is the one 'winnerFromScores' returns
+
+    If k is given, a heap keeps the k best alternatives, which takes O(m log k) operations instead of sorting all the alternatives.
+    '''
+
+    # The tie break order is the same for any set of tied alternatives, so it is found once for all the alternatives
+    tieOrder = tieBreakOrder(tieBreakOption, list(range(1, len(totalScore) + 1)), preferenceProfile)
+
+    if tieOrder is False:
+        return False
+
+    # tiePosition[a - 1] is smaller for the alternative which is preferred by the tie break
+    tiePosition = [0 for _ in range(len(totalScore))]
+
+    for position, alternative in enumerate(tieOrder):
+        tiePosition[alternative - 1] = position
+
+    orderKey = lambda alternative: (totalScore[alternative - 1], -tiePosition[alternative - 1])
+
+    if k is None:
+        bestAlternatives = sorted(range(1, len(totalScore) + 1), key=orderKey, reverse=True)
+    else:
+        bestAlternatives = heapq.nlargest(k, range(1, len(totalScore) + 1), key=orderKey)
+
+    return [(alternative, totalScore[alternative - 1]) for alternative in bestAlternatives]
+
+
+
+
+def generatePreferences(valuationSheet, chunkSize=CHUNK_SIZE, workers=None) -> PreferenceProfile:
+
+    '''
+    Input: a worksheet, OR the path of an 'xlsx' or 'csv' file, containing a set of numerical values assigned by the agents for the different alternatives;
+            an optional number of rows to read at a time;
+            an optional number of processes to read a 'csv' file in parallel, see 'shardedPreferences' (an 'xlsx' file is read by one process)
+
+    Output: the preference profile according to the valuation in the worksheet, as a PreferenceProfile;
+            profile[agent] returns the ordered list of preferences of the agent, the same as the dictionary returned earlier
+
+    The steps followed are:
+    Associate an alternative number for each column starting from 1 and adding 1 for subsequent columns
+    Associate an agent number for each row starting from 1 and adding 1 for subsequent rows 
+    The preferences of all the agents are stored in a single matrix, the row (agent - 1) holds the preferences of the agent
+
+    The rows are read in chunks; each chunk is converted to the compact rank matrix before the next chunk is read.
+    The sum of the valuations of each alternative is calculated in the same pass, so range voting does not need to read the valuations again.
+    A binary profile file ('.vpf', see 'saveProfile') already contains the profile, which is loaded without reading the valuations.
+    '''
+
+    if isinstance(valuationSheet, (str, os.PathLike)) and os.fspath(valuationSheet).lower().endswith(PROFILE_EXTENSION):
+        return loadProfile(valuationSheet)
+
+    with metricsStage('generatePreferences'):
+
+        if workers is not None and workers > 1 and shardableSource(valuationSheet):
+            return shardedPreferences(valuationSheet, workers, chunkSize)
+
+        return preferencesFromChunks(valuationChunks(valuationSheet, chunkSize))
+
+
+
+
+def preferencesFromChunks(chunks) -> PreferenceProfile:
+
+    '''
+    Input: an iterable of chunks of rows of valuations, see 'valuationChunks'
+
+    Output: the preference profile of the agents in the chunks, in the same order as the rows; see 'generatePreferences'
+
+    The rankings of each chunk are added to a RankingIndex, so each different ranking is stored only once
+    while the agents are read; for each agent, only the number of its ranking is kept.
+    All the rows of a chunk are ranked at once, see 'rankValuations'.
+    '''
+    
+    rankingIndex = RankingIndex()
+    agentRankingChunks = []
+    valuationSums = None
+
+    for rows in chunks:
+
+        with metricsStage('ranking'):
+
+            # the rows are converted to a matrix once, and used for both the rankings and the sums
+            valuations = valuationMatrix(rows)
+
+            # row (agent - 1) of the chunk holds the ordered list of preferences of the agent, in the compact rank matrix
+            agentRankingChunks.append(rankingIndex.add(rankValuations(valuations)))
+            valuationSums = addValuations(valuationSums, valuations)
+    
+    if not agentRankingChunks:
+        # An empty worksheet results in an empty profile
+        return PreferenceProfile(np.zeros((0, 0), dtype=np.uint8))
+
+    #return the preference profile
+    return rankingIndex.profile(np.concatenate(agentRankingChunks), valuationSums)
+
+
+
+
+def valuationMatrix(rows):
+
+    '''
+    Input: a chunk of rows of valuations, OR a numpy matrix of valuations
+
+    Output: the valuations as a matrix of floats, one row per agent; a blank cell (None) is NaN
+    '''
+
+    return np.asarray(rows, dtype=np.float64)
+
+
+
+
+def rankValuations(valuations):
+
+    '''
+    Input: a matrix of valuations, one row per agent; a blank cell is NaN, see 'valuationMatrix'
+
+    Output: the compact rank matrix of the agents: row (agent - 1) holds the alternatives in decreasing order of valuation,
+            with the smallest integer type which fits all the alternative numbers
+
+    This gives the same order as 'preferenceOrder', for all the rows at once:
+    The columns are reversed, so the alternatives with larger indices come first, and the negated valuations are sorted with a stable sort;
+    the sort keeps the order of equal valuations, so in case of equal valuations the alternative with the larger index is more preferred.
+    This is a lexicographic sort on (valuation decreasing, alternative number decreasing), with the alternative number given by the position.
+    A blank cell is the least preferred: NaN is placed after every number by the sort, and the blank cells are also in decreasing order of index.
+    '''
+
+    noOfAlternatives = valuations.shape[1]
+
+    # order[agent, p] is the column of the reversed matrix at position p; column j of the reversed matrix is alternative m - j
+    order = np.argsort(-valuations[:, ::-1], axis=1, kind='stable')
+
+    rankMatrix = np.empty(order.shape, dtype=rankDtype(noOfAlternatives))
+    np.subtract(noOfAlternatives, order, out=rankMatrix, casting='unsafe')
+
+    return rankMatrix
+
+
+
+
+def preferenceOrder(row) -> list:
+
+    '''
+    Input: the valuations of one agent, one valuation per alternative
+
+    Output: the alternatives in decreasing order of valuation; in case of equal valuations, the alternative with the larger index is more preferred;
+            the blank cells (None or NaN) are the least preferred
+
+    The rows of a file are ranked by 'rankValuations', all the rows of a chunk at once; this function gives the same order for a single row
+    '''
+
+    # enumerate each row of the input worksheet to associate a number with each element, corresponding to the alternative number
+    alternatives = list(enumerate(row, start=1))
+
+    # reverse the order of the alternatives; It is done because of the requirement that in case of similar valuation for different 
+    # alternatives, the alternative with larger indices are considered to be more preferred by the agent.
+    # reversing the list results in the list with descending order of alternative numbers
+    alternatives.reverse()
+    
+    # sort the list in decreasing order of valuations for each agent
+    # In case of equal valuations, the higher indices value appears first
+    # i refers to each enumerated alternative
+    # i[0] referes to the index value of each alternative; the index value is assigned in the enumerate function above
+    # A blank cell cannot be compared with a number, so the key puts it after all the numbers, see 'isBlank'
+    return [i[0] for i in sorted(alternatives, reverse=True, key=lambda x:(not isBlank(x[1]), 0 if isBlank(x[1]) else x[1]))]
+
+
+
+
+def isBlank(valuation) -> bool:
+
+    '''
+    Output: True if the valuation is a blank cell: None (from a worksheet or a 'csv' file) OR NaN (from a matrix of valuations)
+    '''
+
+    # NaN is the only value which is not equal to itself
+    return valuation is None or valuation != valuation
+
+
+
+
+def addValuations(valuationSums, rows):
+
+    '''
+    Input: the running sums of the valuations of each alternative, None before the first chunk;
+            a chunk of rows of valuations, OR a matrix of valuations, see 'valuationMatrix'
+
+    Output: the running sums after adding the valuations of the chunk; a blank cell counts as 0
+    '''
+
+    chunkSum = np.nansum(valuationMatrix(rows), axis=0)
+
+    return chunkSum if valuationSums is None else valuationSums + chunkSum
+
+
+
+
+def sumValuations(valuationSheet, chunkSize=CHUNK_SIZE, workers=None, shardIndex=0, noOfShards=1):
+
+    '''
+    Input: A worksheet, OR the path of an 'xlsx' or 'csv' file, containing valuation for the alternatives by the agents;
+            an optional number of rows to read at a time;
+            an optional number of processes to read a 'csv' file in parallel; each process sums the valuations of one shard of the file;
+            optionally, the shard to sum, if the function runs in one of these processes
+
+    Output: an array with the sum of valuations of each alternative; index (a - 1) corresponds to alternative a
+    
+    The valuations are read in chunks of rows, and the sums are updated after each chunk, so only one chunk is kept in the memory
+    '''
+
+    if workers is not None and workers > 1 and shardableSource(valuationSheet):
+
+        # Each process returns the sums of its shard; the partial sums are added in the order of the shards, and NOT in the order
+        # in which the processes finish, so the result is the same in every run with the same number of processes
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partialSums = executor.map(sumValuations, [valuationSheet] * workers, [chunkSize] * workers, [None] * workers, range(workers), [workers] * workers)
+            partialSums = [partialSum for partialSum in partialSums if partialSum is not None]
+
+        return sum(partialSums[1:], partialSums[0]) if partialSums else None
+
+    valuationSums = None
+
+    with metricsStage('sumValuations'):
+
+        for rows in valuationChunks(valuationSheet, chunkSize, shardIndex, noOfShards):
+            valuationSums = addValuations(valuationSums, rows)
+
+    return valuationSums
+
+
+
+
+def shardedPreferences(valuationFile, workers, chunkSize=CHUNK_SIZE) -> PreferenceProfile:
+
+    '''
+    Input: the path of a 'csv' file containing the valuations;
+            the number of processes;
+            an optional number of rows to read at a time
+
+    Output: the preference profile of the file, with the position counts and the sums of the valuations already calculated
+
+    The file is divided in one shard per process (see 'valuationChunks'); each process reads only its shard, generates the preferences of its agents
+    and counts the positions of the alternatives. The partial results are merged in the order of the shards, so the agents keep the numbers
+    of their rows, and the scoring rules and range voting use the merged counts and sums without counting again.
+    The position counts are integers, so every rule calculated from them (harmonic as well) gives the same scores and ties in every run.
+    '''
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shardProfiles = list(executor.map(countShard, [valuationFile] * workers, [chunkSize] * workers, range(workers), [workers] * workers))
+
+    return mergeProfiles(shardProfiles)
+
+
+
+
+def countShard(valuationFile, chunkSize, shardIndex, noOfShards) -> PreferenceProfile:
+
+    '''
+    Runs in a separate process: generates the preference profile of one shard of the file, and counts the positions of the alternatives
+    '''
+
+    shardProfile = preferencesFromChunks(valuationChunks(valuationFile, chunkSize, shardIndex, noOfShards))
+    shardProfile.positionCounts()
+
+    return shardProfile
+
+
+
+
+def mergeProfiles(profiles) -> PreferenceProfile:
+
+    '''
+    Input: a list of PreferenceProfiles for the same alternatives
+
+    Output: a single PreferenceProfile with the agents of all the profiles, in the order of the list;
+            the agents of the second profile are numbered after the agents of the first profile, and so on
+
+    The position counts and the sums of the valuations are added, if all the profiles have them.
+    A ranking which appears in several profiles is stored only once in the merged profile.
+    '''
+
+    profileMerger = ProfileMerger()
+
+    for profile in profiles:
+        profileMerger.add(profile)
+
+    return profileMerger.profile()
+
+
+
+
+class ProfileMerger:
+
+    '''
+    Merges PreferenceProfiles one at a time, see 'mergeProfiles'
+
+    Only the different rankings and the ranking number of each agent are kept, so a profile may be discarded after it is added;
+    the agents are numbered in the order in which the profiles are added.
+    '''
+
+    def __init__(self):
+
+        self.rankingIndex = RankingIndex()
+        self.agentRankingChunks = []
+        self.valuationSums = None
+        self.positionCounts = None
+
+        # The sums and the position counts are kept only if every profile has them
+        self.allHaveSums = True
+        self.allHavePositionCounts = True
+
+    def add(self, profile):
+
+        '''
+        Input: a PreferenceProfile; its agents are numbered after the agents of the profiles added before
+        '''
+
+        # A profile without agents does not know the number of alternatives, and is not needed in the merged profile
+        if not len(profile):
+            return
+
+        self.agentRankingChunks.append(self.rankingIndex.add(profile.rankings, profile.weights)[profile.agentRanking])
+
+        if profile.valuationSums is None:
+            self.allHaveSums = False
+        elif self.allHaveSums:
+            self.valuationSums = profile.valuationSums if self.valuationSums is None else self.valuationSums + profile.valuationSums
+
+        if profile._positionCounts is None:
+            self.allHavePositionCounts = False
+        elif self.allHavePositionCounts:
+            self.positionCounts = profile._positionCounts if self.positionCounts is None else self.positionCounts + profile._positionCounts
+
+    def profile(self) -> PreferenceProfile:
+
+        '''
+        Output: the PreferenceProfile of all the agents added so far
+        '''
+
+        if not self.agentRankingChunks:
+            return PreferenceProfile(np.zeros((0, 0), dtype=np.uint8))
+
+        mergedProfile = self.rankingIndex.profile(np.concatenate(self.agentRankingChunks), self.valuationSums if self.allHaveSums else None)
+
+        if self.allHavePositionCounts:
+            mergedProfile._positionCounts = self.positionCounts
+
+        return mergedProfile
+
+
+
+
+def dictatorship(preferenceProfile, agent) -> int:
+
+    '''
+    Input: A dictionary containing preference profile; and, a selected agent number
+
+    Output: the most prefered alternative of the selected agent
+
+    Error handling:
+        Error shall be raised if input is an integer but does not correspond to an agent.
+        Error handling is not included for the cases when the input is not an integer.
+    '''
+
+    if isinstance(agent, int):
+
+        #Implement Error handling only if the input for agent number is an integer
+        try:
+
+            return preferenceProfile[agent][0]
+
+        except KeyError:
+            
+            print("Please enter a valid agent number!!")
+            return "Invalid agent number"
+
+    else:
+
+        #If the input is not an integer, the return will terminate the program with an error
+        return preferenceProfile[agent][0]
+
+
+
+
+def tieBreak(option, bestAlternatives, preferenceProfile = None) -> int:
+
+    '''
+    Input: the preferred option for tie break;
+            a list of the best alternatives among which a winner shall be choosen according to the tie break option;
+            an optional input of the dictionary containg preference profile
+
+    Output: the winner alternative among the list of the best alternatives
+
+    Error handling:
+        Error shall be raised if input is an integer but does not correspond to an agent.
+        Error handling is not included for the cases when the input is not an integer.
+    '''
+    
+    if preferenceProfile != None: 
+        # Enter this section only if the input is a preference profile dictionary
+
+        # Implement Error handling for the cases when the input integer does not correspond to any agent
+        try:
+
+            if isinstance(preferenceProfile, PreferenceProfile) and len(bestAlternatives) > 0:
+                # The positions of the alternatives in the preferences of every agent are calculated once per profile,
+                # so the best alternatives are compared by their positions instead of reading the preferences of the agent
+                return preferenceProfile.preferredAlternative(option, bestAlternatives) # 'KeyError' if the input is not an agent number, the same as below
+
+            selectedAlternativePreference = preferenceProfile[option] # This statement will cause a 'KeyError' if the input is not an integer, resulting in execution of 'except' clause
+
+            for alternative in selectedAlternativePreference:
+                
+                #Check the alternatives in the preference of the input agent number
+                if alternative in bestAlternatives:
+                    # The first alternative in the preference order which appear in the list of best alternative, shall be the winning alternative
+                    return alternative
+                
+        except KeyError:
+
+            print("Please enter a valid agent number!!")
+            return False
+        
+    else:
+
+        if option == 'max':
+            return max(bestAlternatives)
+        
+        elif option == 'min':
+            return min(bestAlternatives)
+        
+        else:
+            return "Invalid Tie Break Option!! \nPlease choose 'max' OR 'min' OR an agent number as the tie break option... "
+
+
+
+
+def tieBreakOrder(option, alternatives, preferenceProfile = None) -> list:
+
+    '''
+    Input: the preferred option for tie break;
+            a list of alternatives;
+            an optional input of the dictionary containg preference profile
+
+    Output: the list of alternatives from the most to the least preferred by the tie break;
+            the first alternative is the one 'tieBreak' returns
+    '''
+
+    if preferenceProfile != None and isinstance(option, int):
+
+        try:
+
+            if isinstance(preferenceProfile, PreferenceProfile):
+                # The alternatives are sorted by their positions in the preferences of the agent, see 'PreferenceProfile.agentPositions'
+                positions = preferenceProfile.agentPositions(option)
+                return sorted(alternatives, key=lambda alternative: positions[alternative - 1])
+
+            # The alternatives in the order of the preferences of the agent
+            selectedAlternatives = set(alternatives)
+            return [alternative for alternative in preferenceProfile[option] if alternative in selectedAlternatives]
+
+        except KeyError:
+
+            print("Please enter a valid agent number!!")
+            return False
+
+    if option == 'max':
+        return sorted(alternatives, reverse=True)
+
+    elif option == 'min':
+        return sorted(alternatives)
+
+    print("Invalid Tie Break Option!! \nPlease choose 'max' OR 'min' OR an agent number as the tie break option... ")
+    return False
+
+
+
+
+def scoringRule(preferenceProfile, scoreVector, tieBreakOption) -> int:
+
+    '''
+    Input: A dictionary containing preference profile;
+            A scoring rule to be assigned to the alternatives according to the preference order;
+            A tie breaking option
+
+    Output: The alternative with the highest total score;
+            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
+    
+    For each agent, the highest score in the scoring vector is assigned to the most preferred alternative, the second highest to the second most preferred alternative 
+    and so on.
+    Total score of each alternative is calculated by adding scores assigned for each agent's preferences.
+
+    Error Handling is implemented for the cases when the length of score vector list is not equal to the number of alternatives
+    The score vector is NOT modified
+    '''
+    
+    # A dictionary is converted to the compact rank matrix; a PreferenceProfile is used as it is.
+    # The tie break uses the input of the user, so that an agent number is the key of the dictionary
+    profile = asPreferenceProfile(preferenceProfile)
+    noOfAlternatives = profile.noOfAlternatives
+    
+
+    # Raise an error if the length of the input score vector is not equal to the number of alternatives
+    try:
+
+        if len(scoreVector) != noOfAlternatives:
+            raise Exception("Number of elements in score vector different from number of alternatives")
+        
+    except:
+
+        print("Incorrect input")
+        return False
+
+    # Sort the score vector in decreasing order, because the maximum score shall be assigned to the more prefered alternative and so on for each agent;
+    # sorted() returns a new list, so the score vector of the user is not modified
+    scoreVector = sorted(scoreVector, reverse = True)
+
+    # The total scores and the tied alternatives are calculated once per profile and score vector, see 'cachedRuleResult'
+    _, winningAlternatives = cachedRuleResult(profile, 'scoringRule', scoreVector)
+
+    return winnerFromTies(winningAlternatives, tieBreakOption, preferenceProfile)
+
+
+
+
+def batchScoringRule(preferenceProfile, scoreVectors, tieBreakOption) -> list:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            A list (or a numpy matrix) of score vectors, one score vector per row; NONE of them is modified
+            A tie breaking option, OR a list of tie breaking options
+
+    Output: a list with the winner of the scoring rule for each score vector, the same as 'scoringRule' returns for the vector;
+            if a list of tie breaking options is given, the element for each score vector is the list of winners for each option
+
+    The position counts of the profile are calculated once, so each score vector costs only one product of the m x m position counts
+    with the vector; all the vectors are multiplied at once as a matrix.
+    The scores of each vector are scaled to exact integers (see 'exactScoreVector'); a positive scale does not change which alternatives
+    have the highest score, so the tied alternatives are found without dividing the totals.
+
+    Error Handling is implemented for the cases when the length of a score vector is not equal to the number of alternatives
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+    noOfAlternatives = profile.noOfAlternatives
+
+    if isinstance(scoreVectors, np.ndarray) and scoreVectors.ndim == 2 and scoreVectors.dtype.kind in 'iu':
+        # integer vectors are already exact; np.sort returns a sorted copy, in decreasing order after reversing the columns
+        sortedVectors = np.sort(scoreVectors, axis=1)[:, ::-1].tolist() if scoreVectors.shape[1] == noOfAlternatives else None
+
+    else:
+        # sorted() returns a new list, so the score vectors of the user are not modified
+        sortedVectors = [sorted(scoreVector, reverse = True) for scoreVector in scoreVectors]
+
+        if any(len(scoreVector) != noOfAlternatives for scoreVector in sortedVectors):
+            sortedVectors = None
+
+        else:
+            sortedVectors = [exactScoreVector(scoreVector)[0] for scoreVector in sortedVectors]
+
+    if sortedVectors is None:
+        print("Incorrect input")
+        return False
+
+    if len(sortedVectors) == 0:
+        return []
+
+    positionCounts = profile.positionCounts()
+
+    # No total score can be larger than the largest score multiplied by the number of agents, see 'scoresFromPositionCounts'
+    largestTotal = max(abs(score) for scoreVector in sortedVectors for score in scoreVector) * len(profile)
+
+    if largestTotal < np.iinfo(np.int64).max:
+        totalScores = positionCounts @ np.array(sortedVectors, dtype=np.int64).T
+
+    else:
+        totalScores = positionCounts.astype(object) @ np.array(sortedVectors, dtype=object).T
+
+    # totalScores[a - 1, v] is the total score of alternative a with score vector v; the tied alternatives have the highest score of their column
+    isTied = totalScores == totalScores.max(axis=0)
+
+    tieBreakOptions = tieBreakOption if isinstance(tieBreakOption, (list, tuple)) else [tieBreakOption]
+    winners = []
+
+    for vector in range(len(sortedVectors)):
+
+        winningAlternatives = (np.flatnonzero(isTied[:, vector]) + 1).tolist()
+        vectorWinners = [winnerFromTies(winningAlternatives, option, preferenceProfile) for option in tieBreakOptions]
+
+        winners.append(vectorWinners if isinstance(tieBreakOption, (list, tuple)) else vectorWinners[0])
+
+    return winners
+
+
+
+
+def positionalScores(preferenceProfile, scoreVector) -> list:
+
+    '''
+    Input: A PreferenceProfile;
+            A score vector sorted in decreasing order, the first score is assigned to the most preferred alternative of each agent
+
+    Output: the list of total scores, where the list index corresponds to the alternative number minus 1;
+            the scores are integers for an integer score vector, and exact fractions otherwise
+
+    Total score of an alternative is the sum over the positions of (number of agents placing it at the position) x (score of the position)
+    The position counts are calculated once per profile, so this is a single matrix-vector product and NOT a loop over the agents
+
+    The scores are calculated exactly, see 'exactScoreVector': two alternatives are tied only if their scores are exactly equal,
+    and the result does not depend on the order in which the scores are added
+    '''
+
+    return scoresFromPositionCounts(preferenceProfile.positionCounts(), scoreVector)
+
+
+
+
+def scoresFromPositionCounts(positionCounts, scoreVector) -> list:
+
+    '''
+    Input: a matrix of position counts, see 'PreferenceProfile.positionCounts';
+            A score vector sorted in decreasing order
+
+    Output: the list of exact total scores, see 'positionalScores'
+    '''
+
+    integerScores, scale = exactScoreVector(scoreVector)
+
+    # No total score can be larger than the largest score multiplied by the number of agents
+    largestTotal = max(abs(score) for score in integerScores) * int(positionCounts[:, 0].sum())
+
+    if largestTotal < np.iinfo(np.int64).max:
+        # machine integers are enough; this is the case for plurality, veto, borda and most of the other score vectors
+        totalScore = (positionCounts @ np.array(integerScores, dtype=np.int64)).tolist() # tolist() returns python numbers for comparison of the scores
+
+    else:
+        # python integers do not overflow; there are only m x m multiplications, so this is still fast
+        totalScore = (positionCounts.astype(object) @ np.array(integerScores, dtype=object)).tolist()
+
+    if scale == 1:
+        return totalScore
+
+    return [Fraction(total, scale) for total in totalScore]
+
+
+
+
+def exactScoreVector(scoreVector):
+
+    '''
+    Input: a score vector of integers, fractions or floats
+
+    Output: a list of integer scores and a scale, such that score / scale is exactly equal to the original score, for every score
+
+    Every float is exactly equal to a fraction, so the scale is the least common multiple of the denominators of the scores;
+    for an integer score vector the scale is 1 and the scores are not changed.
+    '''
+
+    scoreFractions = [Fraction(score) for score in scoreVector]
+    scale = lcm(*[score.denominator for score in scoreFractions])
+
+    return [int(score * scale) for score in scoreFractions], scale
+
+
+
+
+def ruleScoreVector(rule, noOfAlternatives) -> list:
+
+    '''
+    Input: the name of a positional voting rule: 'plurality', 'veto', 'borda' OR 'harmonic';
+            the number of alternatives
+
+    Output: the score vector of the rule in decreasing order, i.e. the first score is assigned to the most preferred alternative
+    '''
+
+    if rule == 'plurality':
+        # 1 point to the most preferred alternative and 0 to every other alternative
+        return [1] + [0 for _ in range(noOfAlternatives - 1)]
+
+    elif rule == 'veto':
+        # 0 point to the least prefered alternative and 1 point to every other alternative
+        return [1 for _ in range(noOfAlternatives - 1)] + [0]
+
+    elif rule == 'borda':
+        # m-1 points to the most preferred alternative, down to 0 for the least preferred
+        return [noOfAlternatives - 1 - i for i in range(noOfAlternatives)]
+
+    elif rule == 'harmonic':
+        # 1/j points to the jth favourable alternative; exact fractions, so that ties are found exactly
+        return [Fraction(1, i+1) for i in range(noOfAlternatives)]
+
+    raise ValueError(f"'{rule}' is not a positional voting rule")
+
+
+
+
+def plurality(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+
+    Input: A dictionary containing preference profile;
+            A tie breaking option
+
+    Output: The alternative which appears most time in the first position of the agents' preference ordering
+            In case more than one alternative is most preferred most frequently, choose the winner according to the tie braking option
+    
+    A frequency list is constructed; the elements correspond to the frequency of alternatives, the list indices correspond to 
+    the alternative number minus 1 (because python list indices start from 0)
+    '''
+    
+    profile = asPreferenceProfile(preferenceProfile)
+
+    # Find the frequency of most preffered alternative of all the agents, and the alternatives with the highest frequency;
+    # the tie break uses the input of the user, so that an agent number is the key of the dictionary
+    _, winningAlternatives = cachedRuleResult(profile, 'plurality')
+
+    return winnerFromTies(winningAlternatives, tieBreakOption, preferenceProfile)
+
+
+
+
+def veto(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+    Input: A dictionary containing preference profile;
+            A tie breaking option
+
+    Output: The alternative with highest total score, where the scores are assigned according to the veto rule;
+            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
+    
+    Scoring rule:
+    For every agent-
+    0 point is assigned to the least prefered alternative
+    1 point to every other alternative
+
+    '''
+
+    # Find the number of alternatives; the profile is converted by the scoring rule, which passes the input of the user to the tie break
+    noOfAlternatives = numberOfAlternatives(preferenceProfile)
+
+    # Create a scoring rule; The list contain all 1's except last element which is 0
+    alternativePoints = ruleScoreVector('veto', noOfAlternatives)
+    
+    # Call the scoring rule function and return its value; Pass the preference profile dictionary, scoring rule defined above and the tie break option
+    return scoringRule(preferenceProfile, alternativePoints, tieBreakOption)
+
+
+
+
+def borda(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+ 
+    Input: A dictionary containing preference profile;
+            A tie breaking option
+
+    Output: The alternative with highest total score, where the scores are assigned according to the borda rule;
+            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
+    
+    Scoring rule:
+    For every agent, assign a score of -
+        0 to the least preferred alternative
+        1 to the second least preferred alternative
+        2 to the third least preferred
+        and so on.....
+
+    '''
+
+    # Find the number of alternatives; the profile is converted by the scoring rule, which passes the input of the user to the tie break
+    noOfAlternatives = numberOfAlternatives(preferenceProfile)
+
+    # Create a scoring rule; the elements are m-1, m-2, ... 0
+    alternativePoints = ruleScoreVector('borda', noOfAlternatives)
+
+    # Call the scoring rule function and return its value; Pass the preference profile dictionary, scoring rule defined above and the tie break option
+    return scoringRule(preferenceProfile, alternativePoints, tieBreakOption)
+
+
+
+
+def harmonic(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+    Input: A dictionary containing preference profile;
+            A tie breaking option
+
+    Output: The alternative with highest total score, where the scores are assigned according to the harmonic rule;
+            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
+    
+    Scoring rule:
+    For every agent, assign a score of -
+            1/m to the least preferred alternative
+            1/(m-1) to the second least preferred alternative
+            and so on.....
+            such that:
+            1/j is assigned to the jth favourable alternative
+            
+            So,
+            1 should be assigned to the favourite alternative
+            
+    '''
+    # Find the number of alternatives; the profile is converted by the scoring rule, which passes the input of the user to the tie break
+    noOfAlternatives = numberOfAlternatives(preferenceProfile)
+
+    # Create a scoring rule; the elements are 1, 1/2, ... 1/m
+    alternativeScores = ruleScoreVector('harmonic', noOfAlternatives)
+    
+    # Call the scoring rule function and return its value; Pass the preference profile dictionary, scoring rule defined above and the tie break option
+    return scoringRule(preferenceProfile, alternativeScores, tieBreakOption)
+
+
+
+
+def STV(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+    Input: A dictionary containing preference profile;
+            A tie breaking option
+
+    Output: 
+            The alternative which satisfies the STV voting rule;
+            In case of multiple such alternatives, choose the winner according to the tie braking option
+    
+    The winner is selected in rounds:
+        In each round, the alternative appearing least frequently in first position of agents is removed
+        A frequency list shall be made for first position of agents' alternatives
+        The alternative corresponding to least frequency is identified 
+        There may be more than one alternative for the least frequency
+        All such alternative shall be identified and shall be deleted for subsequent operations
+        
+        These deleted alternatives shall be stored in another list
+        The alternatives deleted last shall participate in tie breaker, which shall resolve a winner alternative
+        If only one alternative is deleted last, it is the winner alternative
+
+    '''
+
+    # The alternatives deleted in the last round have the highest round number; the tie break chooses among them
+    _, winningAlternatives = cachedRuleResult(asPreferenceProfile(preferenceProfile), 'STV')
+
+    return winnerFromTies(winningAlternatives, tieBreakOption, preferenceProfile)
+
+
+
+
+def STVRounds(preferenceProfile) -> list:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile
+
+    Output: a list with the round in which each alternative is deleted by the STV rule, starting from round 1;
+            the list index corresponds to the alternative number minus 1
+            The alternatives deleted in the last round are the ones which participate in the tie break
+
+    The preferences are NOT copied or modified. Instead, every different ranking of the profile has a pointer to the position of its most preferred
+    alternative among the alternatives which are not deleted yet, and the rankings are kept in buckets according to that alternative.
+    When an alternative is deleted, only the rankings in its bucket move their pointer forward to the next alternative which is not deleted,
+    and are added to the bucket of that alternative. The frequency of each alternative is the total weight (number of agents) of its bucket.
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+    rankings, weights = profile.rankings, profile.weights
+    noOfRankings, noOfAlternatives = rankings.shape
+
+    # Position of the current most preferred alternative of each ranking; every ranking starts with its first preference
+    pointer = np.zeros(noOfRankings, dtype=np.intp)
+
+    # remaining[a] is True if alternative a is not deleted yet; index 0 is not used because alternative numbers start with 1
+    remaining = np.ones(noOfAlternatives + 1, dtype=bool)
+    remaining[0] = False
+
+    # buckets[a] is a list of arrays of the rankings (row numbers of the rankings) whose current most preferred alternative is a;
+    # frequency[a] is the number of agents with such rankings
+    buckets = [[] for _ in range(noOfAlternatives + 1)]
+    frequency = np.zeros(noOfAlternatives + 1, dtype=np.int64)
+
+    distributeBallots(rankings, weights, pointer, np.arange(noOfRankings), buckets, frequency)
+
+    eliminationRound = [0 for _ in range(noOfAlternatives)]
+    currentRound = 1
+    noOfRemaining = noOfAlternatives
+
+    # Each round deletes all the alternatives which are least frequently the most preferred, untill no alternative is remaining
+    while noOfRemaining:
+
+        remainingAlternatives = np.flatnonzero(remaining)
+        remainingFrequency = frequency[remainingAlternatives]
+
+        # Find all the alternatives which appear least frequently as the most preffered option
+        leastFrequentAlternatives = remainingAlternatives[remainingFrequency == remainingFrequency.min()]
+
+        remaining[leastFrequentAlternatives] = False
+        noOfRemaining -= len(leastFrequentAlternatives)
+
+        for leastFrequent in leastFrequentAlternatives:
+            eliminationRound[leastFrequent - 1] = currentRound
+
+        # Move the rankings of the deleted alternatives to their next alternative which is not deleted;
+        # this is not needed after the last round, when no alternative is remaining
+        if noOfRemaining:
+
+            # An alternative which is not the most preferred of any agent has an empty bucket
+            movedRankings = np.concatenate([np.zeros(0, dtype=np.intp)] + [group for leastFrequent in leastFrequentAlternatives for group in buckets[leastFrequent]])
+
+            for leastFrequent in leastFrequentAlternatives:
+                buckets[leastFrequent] = []
+                frequency[leastFrequent] = 0
+
+            # Move the pointers forward untill every moved ranking points to an alternative which is not deleted;
+            # each ranking has all the alternatives, so the pointer always finds a remaining alternative
+            pendingRankings = movedRankings
+
+            while pendingRankings.size:
+                pointer[pendingRankings] += 1
+                pendingRankings = pendingRankings[~remaining[rankings[pendingRankings, pointer[pendingRankings]]]]
+
+            distributeBallots(rankings, weights, pointer, movedRankings, buckets, frequency)
+
+        currentRound += 1
+
+    if metrics is not None:
+        metrics.count('STVRounds', currentRound - 1)
+
+    return eliminationRound
+
+
+
+
+def distributeBallots(rankings, weights, pointer, movedRankings, buckets, frequency):
+
+    '''
+    Input: the rankings of the profile and their weights; the pointer of each ranking to its current most preferred alternative;
+            an array of row numbers of the rankings; the buckets and the frequency of each alternative, used by 'STVRounds'
+
+    Adds each of the rankings to the bucket of the alternative its pointer points to, and updates the frequency of the alternatives
+    '''
+
+    if not movedRankings.size:
+        return
+
+    currentChoices = rankings[movedRankings, pointer[movedRankings]].astype(np.intp)
+    frequency += np.bincount(currentChoices, weights=weights[movedRankings], minlength=len(frequency)).astype(np.int64)
+
+    # Sort the rankings by their current choice, and split them into one group per alternative
+    order = np.argsort(currentChoices, kind='stable')
+    sortedChoices = currentChoices[order]
+    groupStarts = np.flatnonzero(np.diff(sortedChoices)) + 1
+
+    for group in np.split(movedRankings[order], groupStarts):
+        buckets[rankings[group[0], pointer[group[0]]]].append(group)
+
+
+
+
+def committeeSize(k, noOfAlternatives) -> bool:
+
+    '''
+    Output: True if k is a valid number of winners of a multi-winner rule, i.e. an integer from 1 to the number of alternatives;
+            otherwise a message is printed and False is returned
+    '''
+
+    if isinstance(k, int) and 1 <= k <= noOfAlternatives:
+        return True
+
+    print(f"Incorrect committee size!! \nPlease choose a number of winners from 1 to {noOfAlternatives}")
+    return False
+
+
+
+
+def committeeFromScores(totalScore, k, tieBreakOption, preferenceProfile) -> list:
+
+    '''
+    Input: a list of total scores, where the list index corresponds to the alternative number minus 1;
+            the number of winners k;
+            A tie breaking option, used to choose among the alternatives with the same score;
+            The preference profile, used if the tie break option is an agent number
+
+    Output: the list of the k alternatives with the highest total scores, from the highest score down
+    '''
+
+    bestAlternatives = rankScores(totalScore, tieBreakOption, preferenceProfile, k)
+
+    if bestAlternatives is False:
+        return False
+
+    return [alternative for alternative, _ in bestAlternatives]
+
+
+
+
+def SNTV(preferenceProfile, k, tieBreakOption) -> list:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            the number of winners k;
+            A tie breaking option
+
+    Output: the k alternatives which appear most times in the first position of the agents' preference ordering (single non-transferable vote),
+            from the most frequent down; the tie break chooses among the alternatives with the same frequency
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+
+    if not committeeSize(k, profile.noOfAlternatives):
+        return False
+
+    # The same frequencies as plurality, see 'cachedRuleResult'
+    return committeeFromScores(cachedRuleResult(profile, 'plurality')[0], k, tieBreakOption, preferenceProfile)
+
+
+
+
+def bloc(preferenceProfile, k, tieBreakOption) -> list:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            the number of winners k;
+            A tie breaking option
+
+    Output: the k alternatives with the highest total scores, where every agent gives 1 point to each of its k most preferred alternatives
+            and 0 points to every other alternative; from the highest score down
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+
+    if not committeeSize(k, profile.noOfAlternatives):
+        return False
+
+    blocVector = [1 for _ in range(k)] + [0 for _ in range(profile.noOfAlternatives - k)]
+
+    return committeeFromScores(cachedRuleResult(profile, 'scoringRule', blocVector)[0], k, tieBreakOption, preferenceProfile)
+
+
+
+
+def kBorda(preferenceProfile, k, tieBreakOption) -> list:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            the number of winners k;
+            A tie breaking option
+
+    Output: the k alternatives with the highest borda scores, from the highest score down
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+
+    if not committeeSize(k, profile.noOfAlternatives):
+        return False
+
+    return committeeFromScores(cachedRuleResult(profile, 'borda')[0], k, tieBreakOption, preferenceProfile)
+
+
+
+
+def multiWinnerSTV(preferenceProfile, k, tieBreakOption) -> list:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            the number of winners k;
+            A tie breaking option
+
+    Output: the k alternatives elected by the single transferable vote with the Droop quota, in the order in which they are elected
+
+    The count is made in steps:
+        The quota is the smallest number of votes which only k alternatives can reach: (number of agents) // (k + 1) + 1
+        Every ballot counts for its most preferred alternative which is neither elected nor deleted
+        If some alternatives reach the quota, the one with the most votes is elected; the votes above the quota (the surplus) are transferred:
+            every ballot counting for the elected alternative moves to its next alternative with its value multiplied by surplus / votes,
+            so the elected alternative keeps exactly one quota (the fractional, or Gregory, transfer)
+        Otherwise the alternative with the fewest votes is deleted, and its ballots move to their next alternative with their value
+        When the alternatives which are not elected or deleted are no more than the remaining seats, they are all elected
+
+    A tie is resolved by the tie break option: among the alternatives with the same votes, the one preferred by the tie break is elected first,
+    and the one least preferred by the tie break is deleted first.
+
+    The ballots are NOT copied for each agent: every different ranking of the profile is one group of ballots with a value
+    (its number of agents times the transfer value), and a pointer to its current alternative, the same as in 'STVRounds'.
+    The values are exact: they are python integers with a common unit, which is the same for the values, the votes and the quota.
+    Before a transfer every value is multiplied by the votes of the elected alternative, so the moved values, multiplied by surplus / votes,
+    are still integers; the values are then divided by their greatest common divisor, so they stay small. Nothing is rounded,
+    so two alternatives have the same votes only if they have exactly the same votes, and such a tie is resolved by the tie break.
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+    rankings = profile.rankings
+    noOfRankings, noOfAlternatives = rankings.shape
+
+    if not committeeSize(k, noOfAlternatives):
+        return False
+
+    # tiePosition[a] is smaller for the alternative which is preferred by the tie break; index 0 is not used
+    tieOrder = tieBreakOrder(tieBreakOption, list(range(1, noOfAlternatives + 1)), preferenceProfile)
+
+    if tieOrder is False:
+        return False
+
+    tiePosition = np.zeros(noOfAlternatives + 1, dtype=np.int64)
+    tiePosition[tieOrder] = np.arange(noOfAlternatives)
+
+    quota = len(profile) // (k + 1) + 1
+
+    # The value of each group of ballots (python integers, which do not overflow), its pointer,
+    # and its current alternative (0 after the ballots have no alternative left)
+    values = np.array(profile.weights.tolist(), dtype=object)
+    pointer = np.zeros(noOfRankings, dtype=np.intp)
+    currentChoice = rankings[:, 0].astype(np.intp)
+
+    # hopeful[a] is True if alternative a is neither elected nor deleted; votes[a] is the value of the ballots counting for a
+    hopeful = np.ones(noOfAlternatives + 1, dtype=bool)
+    hopeful[0] = False
+    votes = np.zeros(noOfAlternatives + 1, dtype=object)
+    np.add.at(votes, currentChoice, values)
+
+    elected = []
+
+    while len(elected) < k:
+
+        hopefulAlternatives = np.flatnonzero(hopeful)
+
+        if len(elected) + len(hopefulAlternatives) <= k:
+            # Every remaining alternative gets a seat, in the order of their votes
+            remainingOrder = sorted(hopefulAlternatives.tolist(), key=lambda alternative: (-votes[alternative], tiePosition[alternative]))
+            elected.extend(remainingOrder)
+            break
+
+        # The alternative with the most votes, and the alternative with the fewest votes; ties are resolved by the tie break
+        mostVotes = min(hopefulAlternatives.tolist(), key=lambda alternative: (-votes[alternative], tiePosition[alternative]))
+
+        if votes[mostVotes] >= quota:
+            # The ballots of the elected alternative keep (surplus / votes) of their value; the unit is divided by the votes,
+            # so the other values, the votes and the quota are multiplied by the votes, and the moved values only by the surplus
+            movedGroups = np.flatnonzero(currentChoice == mostVotes)
+            surplus, total = votes[mostVotes] - quota, votes[mostVotes]
+            movedValues = values[movedGroups] * surplus
+            values *= total
+            values[movedGroups] = movedValues
+            votes *= total
+            quota *= total
+
+            # The common divisor of the values divides the quota and the votes as well, so the unit is made larger by it
+            divisor = gcd(quota, *values.tolist())
+            values //= divisor
+            votes //= divisor
+            quota //= divisor
+
+            elected.append(mostVotes)
+            removedAlternative = mostVotes
+
+        else:
+            removedAlternative = max(hopefulAlternatives.tolist(), key=lambda alternative: (-votes[alternative], tiePosition[alternative]))
+            movedGroups = np.flatnonzero(currentChoice == removedAlternative)
+
+        hopeful[removedAlternative] = False
+        votes[removedAlternative] = 0
+
+        # Move the pointers forward untill every moved group points to an alternative which is neither elected nor deleted,
+        # or has no alternative left
+        pendingGroups = movedGroups
+
+        while pendingGroups.size:
+            pointer[pendingGroups] += 1
+            exhausted = pointer[pendingGroups] >= noOfAlternatives
+            currentChoice[pendingGroups[exhausted]] = 0
+            pendingGroups = pendingGroups[~exhausted]
+            currentChoice[pendingGroups] = rankings[pendingGroups, pointer[pendingGroups]]
+            pendingGroups = pendingGroups[~hopeful[currentChoice[pendingGroups]]]
+
+        np.add.at(votes, currentChoice[movedGroups], values[movedGroups])
+        votes[0] = 0
+
+    return elected
+
+
+
+
+def rangeVoting(valuationSheet, tieBreakOption, chunkSize=CHUNK_SIZE, workers=None, preferenceProfile=None) -> int:
+
+    '''
+    Input: A worksheet, OR the path of an 'xlsx' or 'csv' file, containing valuation for the alternatives by the agents,
+            OR a PreferenceProfile generated from the valuations (which stores the sums of the valuations);
+            A tie breaking option;
+            an optional number of rows to read at a time;
+            an optional number of processes to read a 'csv' file in parallel;
+            optionally, the PreferenceProfile already generated from the same valuations, which is used by an agent tie break
+    Output: 
+            The alternative which satisfies the range voting rule;
+            In case of multiple such alternatives, choose the winner according to the tie braking option
+    
+    The winner is the alternative with maximum sum of valuations
+    The valuations are read in chunks of rows, and the sums are updated after each chunk, so only one chunk is kept in the memory
+    '''
+
+    if isinstance(valuationSheet, PreferenceProfile):
+
+        # The sums were calculated while generating the profile, so the valuations are not read again
+        preferenceProfile = valuationSheet
+        alternativeValueSum = preferenceProfile.valuationSums
+
+        if alternativeValueSum is None:
+            print("Range voting needs the valuations; please pass the worksheet or the file path instead of the preference profile")
+            return False
+
+    elif getattr(preferenceProfile, 'valuationSums', None) is not None:
+
+        # The profile of the same valuations stores the sums as well; a dictionary of preferences does not store them
+        alternativeValueSum = preferenceProfile.valuationSums
+
+    else:
+
+        # Calculate the sum of valuations for each alternative assigned by each agent
+        alternativeValueSum = sumValuations(valuationSheet, chunkSize, workers)
+
+        if alternativeValueSum is None:
+            print("There are no valuations to read")
+            return False
+
+    if isinstance(tieBreakOption, int) and preferenceProfile is None:
+
+        # The sums are checked for a tie only when the tie break needs the preferences of the agent;
+        # only the row of the tie break agent is read again, and NOT the whole preference profile
+        maxPoints = max(alternativeValueSum)
+
+        if list(alternativeValueSum).count(maxPoints) > 1:
+            preferenceProfile = agentPreferences(valuationSheet, tieBreakOption, chunkSize)
+
+    return winnerFromScores(alternativeValueSum.tolist(), tieBreakOption, preferenceProfile)
+
+
+
+
+def agentPreferences(valuationSheet, agent, chunkSize=CHUNK_SIZE) -> dict:
+
+    '''
+    Input: A worksheet, OR the path of an 'xlsx' or 'csv' file, containing valuation for the alternatives by the agents;
+            an agent number;
+            an optional number of rows to read at a time
+
+    Output: a preference profile dictionary with only the given agent, which is enough for the tie break by the agent;
+            the dictionary is empty if the agent is not in the file, so the tie break reports an invalid agent number
+
+    The rows are read only until the row of the agent
+    '''
+
+    if not isinstance(agent, int) or agent < 1:
+        return {}
+
+    firstRow = 1
+
+    for rows in valuationChunks(valuationSheet, chunkSize):
+
+        if agent < firstRow + len(rows):
+            return {agent: preferenceOrder(rows[agent - firstRow])}
+
+        firstRow += len(rows)
+
+    return {}
+
+
+
+
+def condorcet(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            A tie breaking option
+
+    Output: The Condorcet winner: the alternative which is preferred to every other alternative by a majority of the agents;
+            If no alternative is preferred by a majority to every other alternative, the alternatives which are not beaten by any other
+            alternative (those with an equal number of agents for and against them) participate in the tie break;
+            False if every alternative is beaten by some other alternative
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+    notBeatenBy, winningAlternatives = cachedRuleResult(profile, 'condorcet')
+
+    if max(notBeatenBy) < profile.noOfAlternatives - 1:
+        print("There is no Condorcet winner")
+        return False
+
+    return winnerFromTies(winningAlternatives, tieBreakOption, preferenceProfile)
+
+
+
+
+def condorcetScores(preferenceProfile) -> list:
+
+    '''
+    Output: the list with the number of other alternatives which do NOT beat each alternative in a pairwise majority contest;
+            an alternative with score m - 1 is not beaten by any other alternative
+    '''
+
+    pairwiseMatrix = preferenceProfile.pairwiseMatrix()
+
+    # Each alternative is counted as not beating itself, so 1 is subtracted
+    return ((pairwiseMatrix.T <= pairwiseMatrix).sum(axis=1) - 1).tolist()
+
+
+
+
+def copeland(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            A tie breaking option
+
+    Output: The alternative with the highest Copeland score;
+            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
+
+    Scoring rule:
+    For every other alternative-
+        2 points if a majority of the agents prefers the alternative to the other alternative
+        1 point if the agents are equally divided
+        0 points otherwise
+    (the usual scores are 1, 1/2 and 0; they are doubled so that the scores are integers)
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+
+    return winnerFromTies(cachedRuleResult(profile, 'copeland')[1], tieBreakOption, preferenceProfile)
+
+
+
+
+def copelandScores(preferenceProfile) -> list:
+
+    pairwiseMatrix = preferenceProfile.pairwiseMatrix()
+
+    wins = (pairwiseMatrix > pairwiseMatrix.T).sum(axis=1)
+    ties = (pairwiseMatrix == pairwiseMatrix.T).sum(axis=1) - 1 # an alternative is tied with itself, so 1 is subtracted
+
+    return (2 * wins + ties).tolist()
+
+
+
+
+def maximin(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            A tie breaking option
+
+    Output: The alternative whose worst pairwise contest is the best:
+            the score of an alternative is the smallest number of agents which prefer it to any other alternative;
+            In case of same highest score for multiple alternatives, choose the winner according to the tie braking option
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+
+    return winnerFromTies(cachedRuleResult(profile, 'maximin')[1], tieBreakOption, preferenceProfile)
+
+
+
+
+def maximinScores(preferenceProfile) -> list:
+
+    pairwiseMatrix = preferenceProfile.pairwiseMatrix().copy()
+
+    # The contest of an alternative with itself is not counted
+    np.fill_diagonal(pairwiseMatrix, np.iinfo(np.int64).max)
+
+    return pairwiseMatrix.min(axis=1).tolist()
+
+
+
+
+def schulze(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            A tie breaking option
+
+    Output: The Schulze winner: the alternative which is not beaten by any other alternative through the strongest paths;
+            In case of multiple such alternatives, choose the winner according to the tie braking option
+
+    The strength of a path of pairwise contests is its weakest contest; the strongest path between every pair of alternatives is found
+    with the Floyd-Warshall algorithm, one intermediate alternative at a time, for all the pairs at once.
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+
+    return winnerFromTies(cachedRuleResult(profile, 'schulze')[1], tieBreakOption, preferenceProfile)
+
+
+
+
+def schulzeScores(preferenceProfile) -> list:
+
+    '''
+    Output: the list with the number of other alternatives which do NOT beat each alternative through the strongest paths;
+            the Schulze winners have score m - 1
+    '''
+
+    pairwiseMatrix = preferenceProfile.pairwiseMatrix()
+
+    # Only the contests which are won are links of a path
+    strongestPath = np.where(pairwiseMatrix > pairwiseMatrix.T, pairwiseMatrix, 0)
+
+    for intermediate in range(preferenceProfile.noOfAlternatives):
+        strongestPath = np.maximum(strongestPath, np.minimum(strongestPath[:, [intermediate]], strongestPath[[intermediate], :]))
+
+    np.fill_diagonal(strongestPath, 0)
+
+    return ((strongestPath.T <= strongestPath).sum(axis=1) - 1).tolist()
+
+
+
+
+def kemeny(preferenceProfile, tieBreakOption) -> int:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            A tie breaking option, used to order the alternatives with the same borda score in the starting ranking
+
+    Output: The first alternative of the ranking found by 'kemenyRanking'
+    '''
+
+    ranking = kemenyRanking(preferenceProfile, tieBreakOption)
+
+    return ranking[0] if ranking else False
+
+
+
+
+def kemenyRanking(preferenceProfile, tieBreakOption, maxPasses=100, tieBreakProfile=None) -> list:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile;
+            A tie breaking option, used to order the alternatives with the same borda score in the starting ranking;
+            the maximum number of passes of the local search;
+            optionally, the preference profile of the user from which the PreferenceProfile was converted, in which the tie break agent is looked up
+
+    Output: a ranking of all the alternatives which approximates the Kemeny ranking; False if the tie break option is not valid
+
+    The Kemeny ranking agrees with the largest number of pairwise preferences of the agents; finding it exactly takes exponential time,
+    so a local search is used: the search starts from the borda ranking, and moves one alternative to another position of the ranking
+    whenever the move increases the agreement, untill no move increases it (or maxPasses passes are done).
+    The gain of all the moves of an alternative is found with cumulative sums of the pairwise margins, so a pass takes O(m^2) operations.
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+
+    startingRanking = rankScores(positionalScores(profile, ruleScoreVector('borda', profile.noOfAlternatives)), tieBreakOption,
+                                 preferenceProfile if tieBreakProfile is None else tieBreakProfile)
+
+    if startingRanking is False:
+        return False
+
+    # margin[a - 1, b - 1] is the number of agents which prefer a to b minus the number which prefer b to a
+    pairwiseMatrix = profile.pairwiseMatrix()
+    margin = pairwiseMatrix - pairwiseMatrix.T
+
+    ranking = [alternative for alternative, _ in startingRanking]
+
+    for _ in range(maxPasses):
+
+        improved = False
+
+        for alternative in list(ranking):
+
+            position = ranking.index(alternative)
+            others = np.array(ranking) - 1
+
+            # Moving the alternative before the alternatives at positions newPosition .. position - 1 gains their margins;
+            # moving it after the alternatives at positions position + 1 .. newPosition loses its margins against them
+            gainLeft = np.cumsum(margin[alternative - 1, others[:position]][::-1])[::-1]
+            gainRight = np.cumsum(-margin[alternative - 1, others[position + 1:]])
+
+            bestGain, bestPosition = 0, position
+
+            if len(gainLeft) and gainLeft.max() > bestGain:
+                bestGain, bestPosition = gainLeft.max(), int(gainLeft.argmax())
+
+            if len(gainRight) and gainRight.max() > bestGain:
+                bestGain, bestPosition = gainRight.max(), position + 1 + int(gainRight.argmax())
+
+            if bestPosition != position:
+                ranking.pop(position)
+                ranking.insert(bestPosition, alternative)
+                improved = True
+
+        if not improved:
+            break
+
+    return ranking
+
+
+
+
+# Names of the voting rules which may be passed to 'evaluate'
+RULES = ('scoringRule', 'plurality', 'veto', 'borda', 'harmonic', 'STV', 'rangeVoting', 'condorcet', 'copeland', 'maximin', 'schulze', 'kemeny')
+
+
+
+
+@dataclass
+class EvaluationResult:
+
+    '''
+    The result of 'evaluate':
+        winners: a dictionary with the name of each voting rule as key and its winner alternative as value;
+                the winner of 'condorcet' is None if there is no Condorcet winner
+        scores: a dictionary with the name of each voting rule as key and its list of total scores as value,
+                where the list index corresponds to the alternative number minus 1
+                For STV, the score of an alternative is the round in which it is deleted;
+                for kemeny, the score is m minus the position of the alternative in the ranking;
+                for condorcet and schulze, the score is the number of other alternatives which do NOT beat the alternative
+    '''
+
+    winners: dict = field(default_factory=dict)
+    scores: dict = field(default_factory=dict)
+
+
+
+
+def evaluate(preferenceProfile, rules=RULES, tieBreakOption='max', scoreVector=None, chunkSize=CHUNK_SIZE, workers=None):
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile,
+            OR a worksheet / the path of an 'xlsx' or 'csv' file containing the valuations;
+            a list of the names of the voting rules, see RULES;
+            A tie breaking option, used for all the rules;
+            the score vector for 'scoringRule'; it is NOT modified
+            an optional number of rows to read at a time, if the valuations are read from a worksheet or file;
+            an optional number of processes to read a file in parallel, see 'shardedPreferences'
+
+    Output: an EvaluationResult with the winner and the total scores of every rule; False if the input is not valid
+
+    If the valuations are given, they are read only once: the preference profile and the sums of the valuations are made in the same pass.
+    All the positional rules use the same position counts of the profile, so the ballots are counted once for all of them.
+    '''
+
+    if not isinstance(preferenceProfile, Mapping):
+        preferenceProfile = generatePreferences(preferenceProfile, chunkSize, workers)
+
+    unknownRules = [rule for rule in rules if rule not in RULES]
+
+    if unknownRules:
+        print(f"Unknown voting rule(s): {unknownRules}. Please choose from {list(RULES)}")
+        return False
+
+    if 'rangeVoting' in rules and getattr(preferenceProfile, 'valuationSums', None) is None:
+        print("Range voting needs the valuations; please pass the worksheet or the file path instead of the preference profile")
+        return False
+
+    # A dictionary is converted once and used by all the rules; the original input is kept for the tie break
+    profile = asPreferenceProfile(preferenceProfile)
+    noOfAlternatives = profile.noOfAlternatives
+
+    if 'scoringRule' in rules and (scoreVector is None or len(scoreVector) != noOfAlternatives):
+        print("Incorrect input")
+        return False
+
+    result = EvaluationResult()
+
+    for rule in rules:
+
+        result.scores[rule] = ruleScores(profile, rule, scoreVector, tieBreakOption, preferenceProfile)
+
+        # The starting ranking of 'kemeny' cannot be made with a tie break option which is not valid
+        if result.scores[rule] is False:
+            return False
+
+        if rule == 'condorcet' and max(result.scores[rule]) < noOfAlternatives - 1:
+            result.winners[rule] = None
+        else:
+            result.winners[rule] = winnerFromScores(result.scores[rule], tieBreakOption, preferenceProfile)
+
+    return result
+
+
+
+
+def ruleScores(preferenceProfile, rule, scoreVector=None, tieBreakOption='max', tieBreakProfile=None) -> list:
+
+    '''
+    Input: A PreferenceProfile;
+            the name of a voting rule, see RULES;
+            the score vector for 'scoringRule'; it is NOT modified
+            the tie break option, which is needed only by 'kemeny' for its starting ranking;
+            optionally, the preference profile of the user (e.g. a dictionary) from which the PreferenceProfile was converted,
+            in which the tie break agent is looked up; the PreferenceProfile itself is used if it is not given
+
+    Output: the list of total scores of the rule, where the list index corresponds to the alternative number minus 1;
+            the winner of the rule is the alternative with the highest score (for STV, the score is the round in which the alternative is deleted);
+            False if the tie break option is not valid for 'kemeny'
+
+    The scores are taken from the cache if the rule was already used on the same profile, see 'cachedRuleResult'
+    '''
+
+    result = cachedRuleResult(preferenceProfile, rule, scoreVector, tieBreakOption, tieBreakProfile)
+
+    return list(result[0]) if result is not False else False
+
+
+
+
+# The results of the rules, see 'cachedRuleResult'; the most recently used result is at the end
+resultCache = OrderedDict()
+
+
+
+
+def cachedRuleResult(preferenceProfile, rule, scoreVector=None, tieBreakOption='max', tieBreakProfile=None) -> tuple:
+
+    '''
+    Input: the same as 'ruleScores'
+
+    Output: a tuple of the total scores of the rule (a tuple, index (a - 1) corresponds to alternative a)
+            and the tuple of the alternatives with the highest score, which participate in the tie break;
+            False if the tie break option is not valid for 'kemeny' (which is NOT stored)
+
+    The scores do not depend on the tie break option (except the starting ranking of 'kemeny', which depends on the preferences
+    of the tie break agent), so they are stored with the fingerprint
+    of the profile, the rule and the score vector as the key; calling a rule again on the same profile, e.g. with another tie break option,
+    only looks up the result and runs the tie break. At most RESULT_CACHE_SIZE results are kept, the least recently used one is removed first.
+    '''
+
+    # The time of the rule is recorded under the name used by the caller, e.g. 'borda', even if the rule is calculated as 'scoringRule'
+    stageName = rule
+
+    if rule in ('veto', 'borda', 'harmonic'):
+        # these rules are scoring rules, so they share the results with 'scoringRule' for the same score vector
+        scoreVector = ruleScoreVector(rule, preferenceProfile.noOfAlternatives)
+        rule = 'scoringRule'
+
+    if rule == 'scoringRule':
+        ruleOption = tuple(sorted(scoreVector, reverse = True))
+
+    elif rule == 'kemeny' and isinstance(tieBreakOption, int) and tieBreakOption in (preferenceProfile if tieBreakProfile is None else tieBreakProfile):
+        # The starting ranking follows the preferences of the tie break agent, and the fingerprint does not include the order of the agents,
+        # so the preferences of the agent are part of the key, and NOT its number; the agent is looked up in the profile of the user
+        ruleOption = ('agent', tuple((preferenceProfile if tieBreakProfile is None else tieBreakProfile)[tieBreakOption]))
+
+    elif rule == 'kemeny':
+        ruleOption = tieBreakOption
+
+    else:
+        ruleOption = None
+
+    key = (preferenceProfile.fingerprint(), rule, ruleOption)
+
+    if key in resultCache:
+
+        if metrics is not None:
+            metrics.count('cacheHits')
+
+        resultCache.move_to_end(key)
+        return resultCache[key]
+
+    if metrics is not None:
+        metrics.count('cacheMisses')
+
+    with metricsStage(stageName):
+        totalScore = computeRuleScores(preferenceProfile, rule, scoreVector, tieBreakOption, tieBreakProfile)
+
+    if totalScore is False:
+        return False
+
+    totalScore = tuple(totalScore)
+    result = (totalScore, tuple(tiedAlternatives(totalScore)))
+
+    if RESULT_CACHE_SIZE > 0:
+
+        resultCache[key] = result
+
+        while len(resultCache) > RESULT_CACHE_SIZE:
+            resultCache.popitem(last=False)
+
+    return result
+
+
+
+
+def clearResultCache():
+
+    '''
+    Removes all the results stored by 'cachedRuleResult'
+    '''
+
+    resultCache.clear()
+
+
+
+
+def computeRuleScores(preferenceProfile, rule, scoreVector=None, tieBreakOption='max', tieBreakProfile=None) -> list:
+
+    '''
+    Input: the same as 'ruleScores'
+
+    Output: the list of total scores of the rule, calculated from the profile without the cache; False if 'kemeny' cannot make its starting ranking
+    '''
+
+    if rule == 'scoringRule':
+        # sorted() returns a new list, so the score vector of the user is not modified
+        return positionalScores(preferenceProfile, sorted(scoreVector, reverse = True))
+
+    elif rule == 'plurality':
+        return preferenceProfile.firstChoiceCounts().tolist()
+
+    elif rule == 'STV':
+        return STVRounds(preferenceProfile)
+
+    elif rule == 'rangeVoting':
+        return preferenceProfile.valuationSums.tolist()
+
+    elif rule == 'condorcet':
+        return condorcetScores(preferenceProfile)
+
+    elif rule == 'copeland':
+        return copelandScores(preferenceProfile)
+
+    elif rule == 'maximin':
+        return maximinScores(preferenceProfile)
+
+    elif rule == 'schulze':
+        return schulzeScores(preferenceProfile)
+
+    elif rule == 'kemeny':
+        ranking = kemenyRanking(preferenceProfile, tieBreakOption, tieBreakProfile=tieBreakProfile)
+
+        if ranking is False:
+            return False
+
+        kemenyScore = [0 for _ in range(len(ranking))]
+
+        for position, alternative in enumerate(ranking):
+            kemenyScore[alternative - 1] = len(ranking) - position
+
+        return kemenyScore
+
+    return positionalScores(preferenceProfile, ruleScoreVector(rule, preferenceProfile.noOfAlternatives))
+
+
+
+
+def socialRanking(preferenceProfile, rule, tieBreakOption, k=None, scoreVector=None, chunkSize=CHUNK_SIZE, workers=None) -> list:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile,
+            OR a worksheet / the path of an 'xlsx' or 'csv' file containing the valuations (needed for 'rangeVoting');
+            the name of a voting rule, see RULES;
+            A tie breaking option, used to order the alternatives with the same score;
+            optionally, the number k of the best alternatives to return; all the alternatives are returned if k is not given;
+            the score vector for 'scoringRule'; it is NOT modified
+            an optional number of rows to read at a time and number of processes, if the valuations are read from a worksheet or file
+
+    Output: a list of (alternative, score) pairs from the winner down to the k-th best alternative (or the last alternative);
+            the first alternative of the list is the winner returned by the voting rule function
+
+    For STV, the score is the round in which the alternative is deleted, so the list is the reverse of the order of elimination;
+    see 'STVEliminationOrder' for the alternatives deleted in each round.
+    '''
+
+    if not isinstance(preferenceProfile, Mapping):
+        preferenceProfile = generatePreferences(preferenceProfile, chunkSize, workers)
+
+    result = evaluate(preferenceProfile, [rule], tieBreakOption, scoreVector)
+
+    if result is False:
+        return False
+
+    return rankScores(result.scores[rule], tieBreakOption, preferenceProfile, k)
+
+
+
+
+def STVEliminationOrder(preferenceProfile) -> list:
+
+    '''
+    Input: A PreferenceProfile OR a dictionary containing preference profile
+
+    Output: a list with one list of alternatives per round of the STV rule, in the order in which they are deleted;
+            the last list contains the alternatives which participate in the tie break
+    '''
+
+    eliminationRound = STVRounds(preferenceProfile)
+    rounds = [[] for _ in range(max(eliminationRound, default=0))]
+
+    for alternative, currentRound in enumerate(eliminationRound, start=1):
+        rounds[currentRound - 1].append(alternative)
+
+    return rounds
+
+
+
+
+class LiveTally:
+
+    '''
+    Running totals of the voting rules for ballots which arrive (or are withdrawn) one at a time
+
+    The tally keeps the position counts of the alternatives (see 'PreferenceProfile.positionCounts') and the sums of the valuations,
+    and updates them for each ballot which is added or removed. The winner of the scoring rules, plurality, veto, borda, harmonic
+    and range voting can be found at any moment from these totals, without reading the ballots again.
+    Adding or removing a ballot changes only one count per position, so each update takes O(m) operations.
+
+    The preferences of every agent are kept as well, so that an agent number may be used as the tie break option.
+    '''
+
+    def __init__(self, noOfAlternatives):
+
+        self.noOfAlternatives = noOfAlternatives
+        self.positionCounts = np.zeros((noOfAlternatives, noOfAlternatives), dtype=np.int64)
+
+        # The sums are exact fractions, so that removing a ballot cancels its valuations exactly and ties are found exactly
+        self.valuationSums = [Fraction(0) for _ in range(noOfAlternatives)]
+
+        # Dictionaries with agent numbers as keys: the preference list and the valuations of each agent
+        self.preferences = {}
+        self.valuations = {}
+        self.nextAgent = 1
+
+    def addBallot(self, valuations, agent=None):
+
+        '''
+        Input: the valuations of one agent, one valuation per alternative;
+                optionally, the agent number; the next unused number is given to the agent if it is not provided
+
+        Output: the agent number of the ballot
+        '''
+
+        if len(valuations) != self.noOfAlternatives:
+            print("Incorrect input")
+            return False
+
+        if agent is None:
+            agent = self.nextAgent
+
+        if agent in self.preferences:
+            # A new ballot of an agent replaces the earlier ballot of the same agent
+            self.removeBallot(agent)
+
+        preference = preferenceOrder(valuations)
+
+        # The agent puts alternative preference[p] at position p
+        self.positionCounts[np.array(preference) - 1, np.arange(self.noOfAlternatives)] += 1
+
+        for i in range(self.noOfAlternatives):
+            self.valuationSums[i] += 0 if isBlank(valuations[i]) else Fraction(valuations[i])
+
+        self.preferences[agent] = preference
+        self.valuations[agent] = tuple(valuations)
+
+        if isinstance(agent, int) and agent >= self.nextAgent:
+            self.nextAgent = agent + 1
+
+        return agent
+
+    def removeBallot(self, agent):
+
+        '''
+        Input: the agent number of a ballot which was added earlier
+
+        Output: True if the ballot is removed
+        '''
+
+        if agent not in self.preferences:
+            print("Please enter a valid agent number!!")
+            return False
+
+        preference = self.preferences.pop(agent)
+        valuations = self.valuations.pop(agent)
+
+        self.positionCounts[np.array(preference) - 1, np.arange(self.noOfAlternatives)] -= 1
+
+        for i in range(self.noOfAlternatives):
+            self.valuationSums[i] -= 0 if isBlank(valuations[i]) else Fraction(valuations[i])
+
+        return True
+
+    def scores(self, rule, scoreVector=None) -> list:
+
+        '''
+        Input: the name of a voting rule: 'scoringRule', 'plurality', 'veto', 'borda', 'harmonic' OR 'rangeVoting';
+                the score vector, if the rule is 'scoringRule'; it is NOT modified
+
+        Output: the current list of total scores, where the list index corresponds to the alternative number minus 1
+        '''
+
+        if rule == 'scoringRule':
+            return scoresFromPositionCounts(self.positionCounts, sorted(scoreVector, reverse = True))
+
+        elif rule == 'plurality':
+            return self.positionCounts[:, 0].tolist()
+
+        elif rule == 'rangeVoting':
+            return list(self.valuationSums)
+
+        return scoresFromPositionCounts(self.positionCounts, ruleScoreVector(rule, self.noOfAlternatives))
+
+    def winner(self, rule, tieBreakOption, scoreVector=None) -> int:
+
+        '''
+        Input: the name of a voting rule, see 'scores';
+                A tie breaking option, the same as for the voting rule functions;
+                the score vector, if the rule is 'scoringRule'
+
+        Output: the current winner alternative of the rule
+        '''
+
+        if rule not in ('scoringRule', 'plurality', 'veto', 'borda', 'harmonic', 'rangeVoting'):
+            print(f"Live tally is not available for the voting rule '{rule}'")
+            return False
+
+        if rule == 'scoringRule' and (scoreVector is None or len(scoreVector) != self.noOfAlternatives):
+            print("Incorrect input")
+            return False
+
+        return winnerFromScores(self.scores(rule, scoreVector), tieBreakOption, self.preferences)
+
+
+
+
+def saveProfile(path, preferenceProfile, valuations=None, chunkSize=CHUNK_SIZE):
+
+    '''
+    Input: the path of the binary file to write;
+            A PreferenceProfile OR a dictionary containing preference profile;
+            optionally, the valuations of the agents, as a numpy matrix, a worksheet or the path of an 'xlsx' or 'csv' file,
+            which are needed by range voting; they must be the valuations from which the profile was generated
+            an optional number of rows to read at a time, if the valuations are read from a worksheet or file
+
+    The file contains a small header followed by the arrays of the profile, each starting at a multiple of 8 bytes:
+        the rankings (1, 2 or 4 bytes per alternative, according to the number of alternatives), the weights of the rankings,
+        the ranking number of each agent, the sums of the valuations (if known) and the valuations (if given, 8 bytes each)
+    The arrays are written as they are stored in the memory, so 'loadProfile' can use them directly from the file.
+    '''
+
+    profile = asPreferenceProfile(preferenceProfile)
+
+    rankings = np.ascontiguousarray(profile.rankings, dtype=rankDtype(profile.noOfAlternatives))
+    weights = np.ascontiguousarray(profile.weights, dtype=np.int64)
+    agentRanking = np.ascontiguousarray(profile.agentRanking, dtype=np.uint32 if len(rankings) <= np.iinfo(np.uint32).max else np.int64)
+
+    flags = 0
+    valuationSums = profile.valuationSums
+
+    if valuationSums is not None:
+        flags |= PROFILE_HAS_SUMS
+
+    if valuations is not None:
+        flags |= PROFILE_HAS_VALUATIONS
+
+    header = PROFILE_HEADER.pack(PROFILE_MAGIC, PROFILE_VERSION, flags, profile.noOfAlternatives, rankings.itemsize, agentRanking.itemsize, 0, len(rankings), len(agentRanking))
+
+    # The file is written under a temporary name and renamed when it is complete, so a file which fails to be written
+    # (e.g. valuations with the wrong number of rows) does not replace the file at the path, nor leaves a corrupt profile file
+    temporaryPath = os.fspath(path) + '.tmp'
+
+    try:
+
+        with open(temporaryPath, 'wb') as profileFile:
+
+            profileFile.write(header)
+
+            arrays = [rankings, weights, agentRanking]
+
+            if valuationSums is not None:
+                arrays.append(np.ascontiguousarray(valuationSums, dtype=np.float64))
+
+            for array in arrays:
+                writeAligned(profileFile, array)
+
+            if valuations is not None:
+
+                # The valuations are written one chunk at a time, so a large file of valuations is never loaded at once
+                writeAligned(profileFile, np.zeros(0))
+                noOfRows = 0
+
+                for rows in valuationChunks(valuations, chunkSize):
+                    chunk = np.array(rows, dtype=np.float64)
+                    profileFile.write(chunk.tobytes())
+                    noOfRows += len(chunk)
+
+                if noOfRows != len(agentRanking):
+                    raise ValueError("The valuations do not have one row for each agent of the profile")
+
+    except BaseException:
+
+        if os.path.exists(temporaryPath):
+            os.remove(temporaryPath)
+
+        raise
+
+    os.replace(temporaryPath, path)
+
+
+
+
+def writeAligned(profileFile, array):
+
+    '''
+    Writes the array to the file after padding the file with zero bytes to a multiple of 8 bytes
+    '''
+
+    profileFile.write(bytes(-profileFile.tell() % 8))
+    profileFile.write(array.tobytes())
+
+
+
+
+def loadProfile(path) -> PreferenceProfile:
+
+    '''
+    Input: the path of a binary file written by 'saveProfile'
+
+    Output: the PreferenceProfile stored in the file; if the file contains the valuations, they are available as profile.valuations
+            (a numpy matrix, one row per agent), which may be passed to 'rangeVoting' or 'generatePreferences'
+
+    The file is memory-mapped, and the arrays of the profile are views of the mapped file: nothing is copied or parsed,
+    and the operating system reads the parts of the file which are used, when they are used.
+    '''
+
+    with open(path, 'rb') as profileFile:
+        mappedFile = mmap.mmap(profileFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mappedFile) < PROFILE_HEADER.size:
+        raise ValueError(f"'{path}' is not a profile file")
+
+    magic, version, flags, noOfAlternatives, rankingItemSize, agentItemSize, _, noOfRankings, noOfAgents = PROFILE_HEADER.unpack_from(mappedFile)
+
+    if magic != PROFILE_MAGIC:
+        raise ValueError(f"'{path}' is not a profile file")
+
+    if version != PROFILE_VERSION:
+        raise ValueError(f"'{path}' has version {version} of the profile format; only version {PROFILE_VERSION} can be read")
+
+    offset = PROFILE_HEADER.size
+
+    def nextArray(dtype, count):
+
+        # Each array starts at a multiple of 8 bytes, see 'writeAligned'
+        nonlocal offset
+        offset += -offset % 8
+        array = np.frombuffer(mappedFile, dtype=dtype, count=count, offset=offset)
+        offset += array.nbytes
+
+        return array
+
+    rankings = nextArray(np.dtype(f'<u{rankingItemSize}'), noOfRankings * noOfAlternatives).reshape(noOfRankings, noOfAlternatives)
+    weights = nextArray(np.dtype('<i8'), noOfRankings)
+    agentRanking = nextArray(np.dtype('<u4') if agentItemSize == 4 else np.dtype('<i8'), noOfAgents)
+    valuationSums = nextArray(np.dtype('<f8'), noOfAlternatives) if flags & PROFILE_HAS_SUMS else None
+
+    profile = PreferenceProfile(rankings, weights, agentRanking, valuationSums)
+    profile.valuations = nextArray(np.dtype('<f8'), noOfAgents * noOfAlternatives).reshape(noOfAgents, noOfAlternatives) if flags & PROFILE_HAS_VALUATIONS else None
+
+    return profile
+
+
+
+
+# Names of the voting rules which may be passed to 'estimateWinner'
+SAMPLED_RULES = ('plurality', 'borda', 'scoringRule', 'rangeVoting')
+
+
+
+
+@dataclass
+class WinnerEstimate:
+
+    '''
+    The result of 'estimateWinner':
+        winner: the alternative with the highest average score in the rows which are read
+        runnerUp: the alternative with the second highest average score (None if there is only one alternative)
+        margin: the difference of the average scores (per agent) of the winner and the runner-up
+        bound: the margin needed to separate the winner from every other alternative with the requested confidence; 0 if all the rows are read
+        separated: True if the margin is larger than the bound, i.e. the winner is known with the requested confidence
+        rowsRead: the number of rows (agents) which are read
+        complete: True if all the rows are read, so the winner is exact
+        averageScores: the average score per agent of each alternative, where the list index corresponds to the alternative number minus 1
+    '''
+
+    winner: int
+    runnerUp: Optional[int]
+    margin: float
+    bound: float
+    separated: bool
+    rowsRead: int
+    complete: bool
+    averageScores: list = field(default_factory=list)
+
+
+
+
+def sampleChunks(valuationSheet, chunkSize, randomSample=False, seed=None):
+
+    '''
+    Output: yields the rows of the valuations in chunks, see 'valuationChunks';
+            if randomSample is True, the rows of a numpy matrix (or of the valuations stored in a '.vpf' file) are yielded in a random order
+    '''
+
+    if randomSample and isinstance(valuationSheet, (str, os.PathLike)) and os.fspath(valuationSheet).lower().endswith(PROFILE_EXTENSION):
+        valuationSheet = loadProfile(valuationSheet).valuations
+
+    if randomSample and isinstance(valuationSheet, np.ndarray):
+
+        # Every row is read at most once, in the order of a random permutation
+        rowOrder = np.random.default_rng(seed).permutation(len(valuationSheet))
+
+        for firstRow in range(0, len(rowOrder), chunkSize):
+            yield valuationSheet[np.sort(rowOrder[firstRow:firstRow + chunkSize])]
+
+        return
+
+    yield from valuationChunks(valuationSheet, chunkSize)
+
+
+
+
+def estimateWinner(valuationSheet, rule, tieBreakOption='max', scoreVector=None, confidence=0.95, chunkSize=CHUNK_SIZE,
+                   randomSample=False, seed=None, maxRows=None, valuationRange=None):
+
+    '''
+    Input: A worksheet, OR the path of an 'xlsx', 'csv' or '.vpf' file, OR a numpy matrix, containing the valuations;
+            the name of the voting rule: 'plurality', 'borda', 'scoringRule' OR 'rangeVoting';
+            A tie breaking option, used if the average scores of the best alternatives are equal;
+            the score vector for 'scoringRule'; it is NOT modified;
+            the confidence with which the winner shall be separated from the other alternatives, e.g. 0.95;
+            an optional number of rows to read at a time; the winner is checked after each chunk;
+            True if the rows shall be read in a random order (only for a numpy matrix or a '.vpf' file), and the seed of the random order;
+            optionally, the largest number of rows to read;
+            for range voting, the smallest and the largest possible valuation; the smallest and largest valuations read so far if it is not given
+
+    Output: a WinnerEstimate; False if the rule or the score vector is not valid
+
+    The rows are read one chunk at a time, and the average score of each alternative per agent is updated after each chunk.
+    Reading stops as soon as the leading alternative is separated from all the other alternatives:
+        the score of an agent is between the smallest and the largest score of the rule, so the difference of the scores of two alternatives
+        for an agent has a range R of twice that; by Hoeffding's inequality, the average difference of n agents is more than its expected value
+        plus R x sqrt(ln(1 / delta) / 2n) with probability at most delta
+        delta is (1 - confidence) divided among every ordered pair of alternatives and every check, the j-th check taking 1 / (j (j + 1)) of it,
+        so the bound holds for any leader at every check at the same time
+    The bound assumes that the rows are read in a random order; a file is read from its first row, which is the same only if the rows of the file
+    are not ordered in any way (e.g. by region or by time of voting), otherwise the rows shall be read in random order from a matrix.
+    If all the rows are read, the result is exact and the bound is 0. If the reading stops at the last chunk of a numpy matrix or a '.vpf' file,
+    the result is exact as well; for an 'xlsx' or 'csv' file, whose rows are not counted in advance, it is reported as an estimate.
+    '''
+
+    if rule not in SAMPLED_RULES:
+        print(f"Unknown voting rule: {rule}. Please choose from {list(SAMPLED_RULES)}")
+        return False
+
+    totalScore = None
+    rowsRead = 0
+    noOfChecks = 0
+    complete = True
+    lowestScore, highestScore = valuationRange if valuationRange is not None else (None, None)
+    chunks = sampleChunks(valuationSheet, chunkSize, randomSample, seed)
+
+    # The number of rows of a numpy matrix or of a '.vpf' file is known before reading them; the rows of an 'xlsx' or 'csv' file are not counted
+    if isinstance(valuationSheet, np.ndarray):
+        totalRows = len(valuationSheet)
+    elif isinstance(valuationSheet, (str, os.PathLike)) and os.fspath(valuationSheet).lower().endswith(PROFILE_EXTENSION):
+        totalRows = len(loadProfile(valuationSheet))
+    else:
+        totalRows = None
+
+    for rows in chunks:
+
+        valuations = valuationMatrix(rows)
+        noOfRows, noOfAlternatives = valuations.shape
+
+        if totalScore is None:
+
+            totalScore = np.zeros(noOfAlternatives, dtype=np.float64)
+
+            if rule != 'rangeVoting':
+
+                if rule == 'scoringRule' and (scoreVector is None or len(scoreVector) != noOfAlternatives):
+                    print("Incorrect input")
+                    return False
+
+                # sorted() returns a new list, so the score vector of the user is not modified
+                positionScores = np.array(sorted(scoreVector, reverse = True) if rule == 'scoringRule' else ruleScoreVector(rule, noOfAlternatives), dtype=np.float64)
+                lowestScore, highestScore = positionScores.min(), positionScores.max()
+
+        if rule == 'rangeVoting':
+
+            # A blank cell counts as 0, see 'addValuations'
+            totalScore += np.nansum(valuations, axis=0)
+
+            if valuationRange is None:
+                chunkValues = np.nan_to_num(valuations, nan=0.0)
+                lowestScore = chunkValues.min() if lowestScore is None else min(lowestScore, chunkValues.min())
+                highestScore = chunkValues.max() if highestScore is None else max(highestScore, chunkValues.max())
+
+        else:
+            # The alternative at position p of each agent gets the score of position p; index 0 of the bincount is not used
+            rankMatrix = rankValuations(valuations)
+            totalScore += np.bincount(rankMatrix.ravel(), weights=np.tile(positionScores, noOfRows), minlength=noOfAlternatives + 1)[1:]
+
+        rowsRead += noOfRows
+        noOfChecks += 1
+
+        estimate = winnerEstimate(totalScore, rowsRead, noOfChecks, highestScore - lowestScore, confidence, complete=False)
+
+        if estimate.separated or (maxRows is not None and rowsRead >= maxRows):
+
+            # The result is exact if the last chunk holds the last rows of the source; no more rows are read to find it out,
+            # so it is known only if the number of rows of the source is known
+            complete = totalRows is not None and rowsRead >= totalRows
+            break
+
+    # the file is closed, if the rows are not all read
+    chunks.close()
+
+    if totalScore is None:
+        print("There are no valuations to read")
+        return False
+
+    if complete:
+        estimate = winnerEstimate(totalScore, rowsRead, noOfChecks, highestScore - lowestScore, confidence, complete=True)
+
+    if estimate.runnerUp is not None and estimate.margin == 0:
+
+        # The best alternatives have the same average score, so the tie break chooses the winner
+        preferenceProfile = agentPreferences(valuationSheet, tieBreakOption, chunkSize) if isinstance(tieBreakOption, int) else None
+        bestAlternatives = rankScores(estimate.averageScores, tieBreakOption, preferenceProfile, 2)
+
+        if bestAlternatives is False:
+            return False
+
+        estimate.winner, estimate.runnerUp = bestAlternatives[0][0], bestAlternatives[1][0]
+
+    return estimate
+
+
+
+
+def winnerEstimate(totalScore, rowsRead, noOfChecks, scoreRange, confidence, complete) -> WinnerEstimate:
+
+    '''
+    Output: the WinnerEstimate of the total scores of the rows read so far, see 'estimateWinner'
+    '''
+
+    averageScores = (totalScore / rowsRead).tolist()
+    noOfAlternatives = len(averageScores)
+
+    # The two best alternatives; equal averages are ordered by 'max' here, the tie break is applied to the final estimate
+    bestAlternatives = rankScores(averageScores, 'max', None, 2)
+    winner = bestAlternatives[0][0]
+
+    if noOfAlternatives == 1:
+        return WinnerEstimate(winner, None, 0.0, 0.0, True, rowsRead, complete, averageScores)
+
+    runnerUp = bestAlternatives[1][0]
+    margin = averageScores[winner - 1] - averageScores[runnerUp - 1]
+
+    if complete:
+        bound = 0.0
+    else:
+        delta = (1 - confidence) / (noOfAlternatives * (noOfAlternatives - 1) * noOfChecks * (noOfChecks + 1))
+        bound = 2 * scoreRange * sqrt(log(1 / delta) / (2 * rowsRead))
+
+    return WinnerEstimate(winner, runnerUp, margin, bound, bool(margin > bound), rowsRead, complete, averageScores)